@@ -0,0 +1,121 @@
+import os
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import time
+from rate_limiter import api_rate_limiter, request_with_backoff
+from metrics import sync_metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Base URL of the Workiz API, overridable to point at a local stub server
+API_BASE_URL = os.getenv('WORKIZ_API_BASE_URL', 'https://api.workiz.com/api/v1')
+# Seconds to wait for the TCP/TLS connection and for each read from the socket
+CONNECT_TIMEOUT = float(os.getenv('WORKIZ_CONNECT_TIMEOUT', '10'))
+READ_TIMEOUT = float(os.getenv('WORKIZ_READ_TIMEOUT', '60'))
+# Keep-alive connections kept per host, should cover every concurrent fetcher thread
+POOL_SIZE = int(os.getenv('WORKIZ_POOL_SIZE', '8'))
+# Retries for connection-level failures; HTTP 429/5xx are retried by the rate limiter
+CONNECTION_RETRIES = int(os.getenv('WORKIZ_CONNECTION_RETRIES', '3'))
+
+
+class WorkizClient:
+    # Reusable Workiz API client: one pooled keep-alive session shared by every endpoint fetch
+    def __init__(self, api_token, base_url=API_BASE_URL, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 pool_size=POOL_SIZE, retries=CONNECTION_RETRIES):
+        self.api_token = api_token
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=0,
+            backoff_factor=0.5,
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'accept': '*/*',
+            'Accept-Encoding': 'gzip, deflate',
+        })
+
+    def get_url(self, endpoint):
+        return f"{self.base_url}/{self.api_token}/{endpoint}/"
+
+    # Function to send one GET, recording its latency and status for the endpoint
+    def _get(self, endpoint, params, stream=False):
+        started = time.perf_counter()
+        response = self.session.get(self.get_url(endpoint), params=params, timeout=self.timeout, stream=stream)
+        sync_metrics.observe('workiz_api_request_seconds', endpoint, time.perf_counter() - started)
+        sync_metrics.inc('workiz_api_responses_total', endpoint, labels={'status': str(response.status_code)})
+        return response
+
+    def _record_bytes(self, endpoint, response):
+        # tell() counts bytes read off the socket, i.e. before gzip decoding
+        received = response.raw.tell() if response.raw is not None else len(response.content)
+        sync_metrics.inc('workiz_api_bytes_received_total', endpoint, received)
+
+    # Function to fetch one page of an endpoint through the rate limiter
+    def get_page(self, endpoint, date, offset, records=100, limiter=api_rate_limiter):
+        params = {
+            'start_date': date,
+            'offset': offset,
+            'records': records,
+            'only_open': 'false',
+        }
+        response = request_with_backoff(lambda: self._get(endpoint, params), limiter)
+        if response.status_code == 200:
+            data = response.json()
+            self._record_bytes(endpoint, response)
+            return data
+        else:
+            response.raise_for_status()
+
+    # Function to stream one page, yielding records from the `data` array as they are parsed
+    # so only a single record is materialised at a time. Needs the optional ijson package.
+    def iter_page_records(self, endpoint, date, offset, records=100, limiter=api_rate_limiter):
+        import ijson
+
+        params = {
+            'start_date': date,
+            'offset': offset,
+            'records': records,
+            'only_open': 'false',
+        }
+        response = request_with_backoff(lambda: self._get(endpoint, params, stream=True), limiter)
+        with response:
+            if response.status_code != 200:
+                response.raise_for_status()
+                return
+            # Let urllib3 undo gzip/deflate while ijson reads from the socket
+            response.raw.decode_content = True
+            for record in ijson.items(response.raw, 'data.item', use_float=True):
+                yield record
+            self._record_bytes(endpoint, response)
+
+    def close(self):
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+# Function to get the shared client for an API token, creating it on first use
+def get_client(api_token):
+    with _clients_lock:
+        client = _clients.get(api_token)
+        if client is None:
+            client = _clients[api_token] = WorkizClient(api_token)
+        return client
@@ -0,0 +1,168 @@
+import os
+import argparse
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from db import get_session_factory, init_schema, run_transaction
+from models import BackfillWindow
+from utils import iter_api_pages, bulk_upsert
+from converters import get_converter
+from pipeline import run_pipeline
+from spool import open_spool
+from sync import ENDPOINTS
+
+# Load environment variables
+load_dotenv()
+API_TOKEN = os.getenv('API_TOKEN')
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Oldest entry in the Workiz account (see misc_notes)
+BACKFILL_SINCE = '2022-09-14'
+
+
+# Function to split [since, until) into windows of `window_days` days
+def split_windows(since, until, window_days):
+    start = datetime.strptime(since, "%Y-%m-%d")
+    end = datetime.strptime(until, "%Y-%m-%d")
+    windows = []
+    while start < end:
+        window_end = min(start + timedelta(days=window_days), end)
+        windows.append((start.strftime("%Y-%m-%d"), window_end.strftime("%Y-%m-%d")))
+        start = window_end
+    return windows
+
+# Function to persist the window plan, keeping the progress of windows planned by an earlier backfill
+def plan_windows(session, endpoint, windows):
+    known = {window.WindowStart: window for window in session.query(BackfillWindow).filter(BackfillWindow.Endpoint == endpoint)}
+    for window_start, window_end in windows:
+        if window_start not in known:
+            session.add(BackfillWindow(Endpoint=endpoint, WindowStart=window_start, WindowEnd=window_end,
+                                       NextOffset=0, Status='pending', UpdatedAt=datetime.now()))
+    session.commit()
+    return [
+        (window.WindowStart, window.WindowEnd, window.NextOffset)
+        for window in session.query(BackfillWindow)
+        .filter(BackfillWindow.Endpoint == endpoint, BackfillWindow.Status != 'completed')
+        .order_by(BackfillWindow.WindowStart)
+    ]
+
+# Function to keep the rows created inside [window_start, window_end)
+def filter_window(rows, window_start, window_end):
+    start = datetime.strptime(window_start, "%Y-%m-%d")
+    end = datetime.strptime(window_end, "%Y-%m-%d")
+    return [row for row in rows if row.get('CreatedDate') and start <= row['CreatedDate'] < end]
+
+def _set_window(session, endpoint, window_start, **values):
+    values['UpdatedAt'] = datetime.now()
+    session.query(BackfillWindow).filter(
+        BackfillWindow.Endpoint == endpoint, BackfillWindow.WindowStart == window_start
+    ).update(values, synchronize_session=False)
+
+
+# Function to backfill one window: walk pages from the window start and keep only records created inside it.
+# Pages come oldest first, so the walk stops at the first page entirely past the window end; a page out of
+# that order fails the window.
+# Keeping records by CreatedDate makes windows disjoint, so overlapping pages never write a UUID twice.
+# Setting the `stop` event fails the window after the current page; it resumes from NextOffset later.
+def backfill_window(api_token, endpoint, window_start, window_end, start_offset, Session, stop=None):
+    config = ENDPOINTS[endpoint]
+    table = config['table']
+    convert = get_converter(table)
+    window_end_dt = datetime.strptime(window_end, "%Y-%m-%d")
+    session = Session()
+    totals = {'added': 0, 'changed': 0, 'unchanged': 0, 'completed': False}
+    spool = open_spool(endpoint, window_start=window_start)
+
+    def pages():
+        last_created = None
+        for offset, data in iter_api_pages(api_token, endpoint, window_start, start_offset, config['limiter'], spool):
+            rows = [convert(item) for item in data]
+            created = [row['CreatedDate'] for row in rows if row.get('CreatedDate')]
+            # Stopping early is only safe while pages come oldest first; fail the window rather than miss records
+            if created and (created != sorted(created) or (last_created is not None and created[0] < last_created)):
+                raise RuntimeError(f"page at offset {offset} is not in CreatedDate order, so the window end cannot be detected")
+            yield offset, rows
+            if created:
+                last_created = created[-1]
+                if created[0] >= window_end_dt:
+                    return
+            if stop is not None and stop.is_set():
+                raise RuntimeError("stop requested")
+
+    def write_page(page):
+        offset, rows = page
+        rows = filter_window(rows, window_start, window_end)
+
+        def write(session):
+            counts = bulk_upsert(rows, table, session, commit=False, run_id=f"backfill-{window_start}")
+            _set_window(session, endpoint, window_start, NextOffset=offset + 1)
+            return counts
+
+        added, changed, unchanged = run_transaction(session, write)
+        totals['added'] += added
+        totals['changed'] += changed
+        totals['unchanged'] += unchanged
+
+    try:
+        _set_window(session, endpoint, window_start, Status='running')
+        session.commit()
+        run_pipeline(pages, write_page, name=f"{endpoint}-{window_start}")
+        _set_window(session, endpoint, window_start, Status='completed')
+        session.commit()
+        totals['completed'] = True
+        if spool is not None:
+            spool.discard()
+        logger.info(f"Endpoint {endpoint}: window {window_start}..{window_end} done: {totals}")
+    except Exception as e:
+        session.rollback()
+        _set_window(session, endpoint, window_start, Status='failed')
+        session.commit()
+        logger.error(f"Endpoint {endpoint}: window {window_start}..{window_end} failed: {e}")
+    finally:
+        session.close()
+    return totals
+
+
+# Function to backfill every unfinished window of the given endpoints with `workers` windows in flight.
+# All workers share the endpoints' rate limiters and therefore the global API budget.
+def run_backfill(api_token, Session, endpoints, since, until, window_days, workers):
+    jobs = []
+    session = Session()
+    try:
+        for endpoint in endpoints:
+            for window_start, window_end, next_offset in plan_windows(session, endpoint, split_windows(since, until, window_days)):
+                jobs.append((endpoint, window_start, window_end, next_offset))
+    finally:
+        session.close()
+
+    logger.info(f"Backfill: {len(jobs)} windows to fetch with {workers} workers")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='backfill') as executor:
+        futures = {
+            executor.submit(backfill_window, api_token, endpoint, window_start, window_end, next_offset, Session): (endpoint, window_start)
+            for endpoint, window_start, window_end, next_offset in jobs
+        }
+        for future, (endpoint, window_start) in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                # Only reached when even recording the failure failed; the window stays resumable
+                logger.error(f"Endpoint {endpoint}: window {window_start} could not be recorded: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill Workiz history in parallel date windows")
+    parser.add_argument('--endpoint', action='append', choices=list(ENDPOINTS), help="Endpoint to backfill (default: all registered)")
+    parser.add_argument('--since', default=BACKFILL_SINCE, help="First CreatedDate to backfill (YYYY-MM-DD)")
+    parser.add_argument('--until', default=(datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d"), help="Backfill up to this date (exclusive)")
+    parser.add_argument('--window-days', type=int, default=30, help="Days per window")
+    parser.add_argument('--workers', type=int, default=4, help="Windows fetched in parallel")
+    args = parser.parse_args()
+
+    # Create the tables if they do not exist; size DB_POOL_SIZE to at least --workers + 1
+    init_schema()
+
+    run_backfill(API_TOKEN, get_session_factory(), args.endpoint or list(ENDPOINTS), args.since, args.until, args.window_days, args.workers)
@@ -0,0 +1,29 @@
+import sys
+import timeit
+from models import Jobs, Leads
+from utils import flatten_nested_json
+from converters import build_converter
+from sample_data import generate_page
+
+# Micro-benchmark: recursive flatten_nested_json + column filter vs. the compiled converter on one 100-record page
+
+# The previous save_data_to_db transform, kept here as the baseline
+def flatten_and_filter(data, table):
+    table_columns = {column.name for column in table.__table__.columns}
+    rows = []
+    for item in data:
+        flattened_item = flatten_nested_json(item)
+        rows.append({key: value for key, value in flattened_item.items() if key in table_columns})
+    return rows
+
+def bench(kind, table, repeat):
+    page = generate_page(kind)
+    convert = build_converter(table)
+    old = min(timeit.repeat(lambda: flatten_and_filter(page, table), number=repeat, repeat=5)) / repeat
+    new = min(timeit.repeat(lambda: [convert(item) for item in page], number=repeat, repeat=5)) / repeat
+    print(f"{table.__tablename__}: flatten_nested_json {old * 1000:.3f} ms/page, converter {new * 1000:.3f} ms/page, {old / new:.1f}x faster")
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    bench('job', Jobs, repeat)
+    bench('lead', Leads, repeat)
@@ -0,0 +1,95 @@
+import os
+import time
+import argparse
+import tempfile
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, inspect, select, func, insert
+from models import Base, Jobs, Leads, SyncState
+from converters import build_converter
+from sample_data import generate_job, generate_lead
+from migrations import migrate
+
+# Dashboard query benchmark: times representative report queries on generated data
+# without the declared indexes, then again after migrations.migrate() has added them.
+
+
+# Function to build the representative dashboard queries
+def get_queries():
+    since = datetime(2023, 6, 1)
+    until = since + timedelta(days=30)
+    job_day = func.date(Jobs.JobDateTime)
+    return {
+        'revenue by day, 30 days': select(job_day, func.sum(Jobs.JobTotalPrice), func.sum(Jobs.SubTotal))
+            .where(Jobs.JobDateTime >= since, Jobs.JobDateTime < until).group_by(job_day),
+        'done jobs in range': select(func.count()).select_from(Jobs.__table__)
+            .where(Jobs.Status == 'Done', Jobs.JobDateTime >= since, Jobs.JobDateTime < until),
+        'service area schedule': select(Jobs.UUID, Jobs.JobDateTime, Jobs.Status)
+            .where(Jobs.ServiceArea == 'North', Jobs.JobDateTime >= since, Jobs.JobDateTime < until).order_by(Jobs.JobDateTime),
+        'client history': select(Jobs.UUID, Jobs.JobDateTime, Jobs.JobTotalPrice)
+            .where(Jobs.ClientId == 42).order_by(Jobs.JobDateTime.desc()),
+        'jobs updated in a week': select(Jobs.UUID, Jobs.Status)
+            .where(Jobs.LastStatusUpdate >= since, Jobs.LastStatusUpdate < since + timedelta(days=7)),
+        'leads created in range by status': select(Leads.Status, func.count())
+            .where(Leads.CreatedDate >= since, Leads.CreatedDate < until).group_by(Leads.Status),
+    }
+
+# Function to fill the tables with generated, converted records
+def populate(engine, jobs, leads):
+    with engine.begin() as conn:
+        for table, generate, total in [(Jobs, generate_job, jobs), (Leads, generate_lead, leads)]:
+            convert = build_converter(table)
+            rows = {}
+            for i in range(total):
+                row = convert(generate(i))
+                rows[row['UUID']] = row
+            rows = list(rows.values())
+            for start in range(0, len(rows), 1000):
+                conn.execute(insert(table.__table__), rows[start:start + 1000])
+
+# Function to time every query, best of `repeat`
+def run_queries(engine, repeat):
+    timings = {}
+    with engine.connect() as conn:
+        for name, query in get_queries().items():
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(query).fetchall()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = best
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dashboard queries before and after the declared indexes")
+    parser.add_argument('--jobs', type=int, default=50000)
+    parser.add_argument('--leads', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-url', help="Scratch database URL; its Jobs/Leads tables are dropped, and databases "
+                                               "a sync has run against are refused (default: temporary SQLite file)")
+    args = parser.parse_args()
+    logging.getLogger('migrations').setLevel(logging.WARNING)
+
+    engine = create_engine(args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'queries.db')}")
+    if inspect(engine).has_table(SyncState.__tablename__):
+        with engine.connect() as conn:
+            if conn.execute(select(func.count()).select_from(SyncState.__table__)).scalar():
+                parser.error(f"{engine.url.render_as_string(hide_password=True)} holds synced data; use a scratch database")
+    tables = [Jobs.__table__, Leads.__table__]
+    Base.metadata.drop_all(engine, tables=tables)
+    Base.metadata.create_all(engine, tables=tables)
+    # Start from the pre-index schema that existing deployments have
+    for table in (Jobs.__table__, Leads.__table__):
+        for index in table.indexes:
+            index.drop(bind=engine)
+
+    populate(engine, args.jobs, args.leads)
+    before = run_queries(engine, args.repeat)
+    created = migrate(engine)
+    after = run_queries(engine, args.repeat)
+
+    print(f"{engine.url.render_as_string(hide_password=True)}: {args.jobs} jobs, {args.leads} leads, {len(created)} indexes created")
+    for name in before:
+        print(f"{name:35} {before[name] * 1000:9.2f} ms -> {after[name] * 1000:9.2f} ms ({before[name] / after[name]:.1f}x)")
@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import tempfile
+import threading
+import tracemalloc
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from sample_data import generate_page
+
+# Memory benchmark: peak Python allocations while the sync fetches and converts one job page, comparing
+# iter_api_pages (response.json(), then converted by the writer) with iter_streamed_pages (ijson), each
+# with and without a spool. The rows are kept, as the sync keeps them until the page is written.
+
+def serve(body):
+    empty = json.dumps({'flag': True, 'found': 0, 'data': []}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            # Only the first page has records, so the page iterators stop after it
+            offset = parse_qs(urlparse(self.path).query).get('offset', ['0'])[0]
+            payload = body if offset == '0' else empty
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# Function to measure the peak allocations of one fetch; the fetchers print every page, which is silenced
+def measure(fetch):
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        # Warm up the connection pool and imports so no variant pays for them
+        fetch()
+        tracemalloc.start()
+        rows = fetch()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return rows, peak
+
+if __name__ == "__main__":
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    page = generate_page('job', records=records)
+    # Pad the notes so each record is closer to a heavy production job
+    for item in page:
+        item['JobNotes'] = item['JobNotes'] + ' lorem ipsum' * 200
+    body = json.dumps({'flag': True, 'found': len(page), 'data': page}).encode()
+    del page
+    server = serve(body)
+    print(f"page size {len(body) / 1024:.0f} KiB")
+
+    # The API client reads its base URL at import time
+    os.environ['WORKIZ_API_BASE_URL'] = f"http://127.0.0.1:{server.server_port}/api/v1"
+    from models import Jobs
+    from converters import get_converter
+    from rate_limiter import RateLimiter
+    from spool import PageSpool
+    from utils import iter_api_pages, iter_streamed_pages
+
+    limiter = RateLimiter(1000, 1)
+    convert = get_converter(Jobs)
+    spool_dir = tempfile.mkdtemp()
+
+    def new_spool(spooled):
+        return PageSpool(spool_dir, 'job/all') if spooled else None
+
+    # What fetch_data_in_batches holds for a page: the parsed page and, once the writer converted it, its rows
+    def full_page(spooled=False):
+        pages = iter_api_pages('token', 'job/all', '2024-01-01', 0, limiter, new_spool(spooled))
+        _, data = next(pages)
+        rows = [convert(item) for item in data]
+        pages.close()
+        return rows
+
+    def streamed_page(spooled=False):
+        pages = iter_streamed_pages('token', 'job/all', '2024-01-01', 0, Jobs, limiter, new_spool(spooled))
+        _, rows = next(pages)
+        pages.close()
+        return rows
+
+    results = {}
+    for label, fetch in [('response.json()', full_page), ('streaming', streamed_page)]:
+        for spooled in (False, True):
+            name = f"{label}{' + spool' if spooled else ''}"
+            rows, results[name] = measure(lambda: fetch(spooled))
+            print(f"{name}: {len(rows)} rows, peak {results[name] / 1024:.0f} KiB")
+    print(f"streaming peak is {results['streaming'] / results['response.json()'] * 100:.0f}% of response.json(), "
+          f"{results['streaming + spool'] / results['response.json() + spool'] * 100:.0f}% with a spool")
+    server.shutdown()
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import logging
+from workiz_simulator import WorkizSimulator
+
+# End-to-end sync benchmark: runs fetch_data_in_batches against the local Workiz simulator and
+# SQLite (or --database-url) and reports records/sec, per-stage timings and DB round trips.
+# Run this after every performance change and compare against the previous numbers.
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark a full sync against the local Workiz simulator")
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--leads', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.05, help="Simulated API latency per page")
+    parser.add_argument('--rate-limit', type=int, help="Simulated API requests per --rate-window before 429s")
+    parser.add_argument('--rate-window', type=float, default=1.0)
+    parser.add_argument('--requests-per-second', type=float, default=50, help="Fetcher rate limiter budget")
+    parser.add_argument('--database-url', help="SQLAlchemy URL of a scratch database, e.g. a throwaway local MySQL; "
+                                               "every table in it is dropped (default: temporary SQLite file)")
+    parser.add_argument('--drop', action='store_true', help="Confirm that every table of --database-url may be dropped")
+    parser.add_argument('--stream', action='store_true', help="Use the streaming parser")
+    parser.add_argument('--runs', type=int, default=2, help="Syncs to run; later runs measure the unchanged-record path")
+    parser.add_argument('--metrics', action='store_true', help="Print the fetcher's Prometheus metrics at the end")
+    args = parser.parse_args()
+    if args.database_url and not args.drop:
+        parser.error("the benchmark drops every table of --database-url; pass --drop to confirm it is a scratch database")
+
+    logging.basicConfig(level=logging.WARNING, force=True)
+    simulator = WorkizSimulator(args.jobs, args.leads, args.latency, args.rate_limit, args.rate_window, retry_after=1)
+    # The API client reads its base URL at import time
+    os.environ['WORKIZ_API_BASE_URL'] = simulator.start()
+
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from models import Base, Jobs, Leads
+    from utils import fetch_data_in_batches
+    from rate_limiter import RateLimiter
+    for name in ('utils', 'rate_limiter', 'sync_state', 'pipeline', 'api_client', 'metrics'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    round_trips = {'count': 0}
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_round_trip(conn, cursor, statement, parameters, context, executemany):
+        round_trips['count'] += 1
+
+    print(f"database {engine.url.render_as_string(hide_password=True)}, {args.jobs} jobs, {args.leads} leads, latency {args.latency}s")
+    for run in range(1, args.runs + 1):
+        for endpoint, table, total in [('job/all', Jobs, args.jobs), ('lead/all', Leads, args.leads)]:
+            limiter = RateLimiter(args.requests_per_second, 1, name=endpoint)
+            round_trips['count'] = 0
+            started = time.perf_counter()
+            with open(os.devnull, 'w') as devnull:
+                # fetch_data_in_batches prints every page
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    result = fetch_data_in_batches('token', endpoint, '2022-01-01', 0, table, Session(), limiter=limiter, stream=args.stream)
+                finally:
+                    sys.stdout = stdout
+            elapsed = time.perf_counter() - started
+
+            timings = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in result['timings'].items())
+            limiter_metrics = limiter.get_metrics()
+            print(
+                f"run {run} {endpoint}: {'ok' if result['completed'] else 'FAILED'} {total} records in {elapsed:.2f}s "
+                f"({total / elapsed:.0f} records/s) | added {result['added']} changed {result['changed']} unchanged {result['unchanged']} | "
+                f"{timings} | rate limit wait {limiter_metrics['wait_seconds']:.2f}s, throttled {limiter_metrics['throttled']} | "
+                f"{round_trips['count']} DB round trips ({round_trips['count'] / max(1, result['last_offset']):.1f}/page)"
+            )
+    print(f"simulator: {simulator.stats}")
+    if args.metrics:
+        from metrics import sync_metrics
+        print(sync_metrics.render())
+    simulator.stop()
@@ -0,0 +1,76 @@
+import os
+import math
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from models import ChangeLog
+
+# Seconds a gap in the Ids is waited for before it is taken as a rolled-back write (see get_changes)
+CHANGE_LOG_SETTLE_SECONDS = int(os.getenv('CHANGE_LOG_SETTLE_SECONDS', '120'))
+
+
+# Function to compare a stored value with the value being written.
+# MySQL FLOAT columns are single precision, so floats only count as changed beyond that precision.
+def _is_same(old, new):
+    if isinstance(old, float) and isinstance(new, (int, float)):
+        return math.isclose(old, new, rel_tol=1e-6, abs_tol=1e-9)
+    return old == new
+
+# Function to list the columns of `row` whose value differs from the stored row
+def get_changed_columns(old_row, row):
+    return sorted(column for column, value in row.items() if not _is_same(old_row.get(column), value))
+
+# Function to build the change records for the rows bulk_upsert is writing.
+# Rows whose hash changed without any column value changing are not recorded.
+def build_change_records(table_name, rows, old_rows, run_id=None):
+    changed_at = datetime.now()
+    records = []
+    for row in rows:
+        old_row = old_rows.get(row['UUID'])
+        if old_row is None:
+            operation, changed_columns = 'insert', sorted(column for column, value in row.items() if value is not None)
+        else:
+            operation, changed_columns = 'update', get_changed_columns(old_row, row)
+            if not changed_columns:
+                continue
+        records.append({
+            'TableName': table_name,
+            'UUID': row['UUID'],
+            'Operation': operation,
+            'ChangedColumns': changed_columns,
+            'OldStatus': old_row.get('Status') if old_row else None,
+            'NewStatus': row.get('Status', old_row.get('Status') if old_row else None),
+            'RunId': run_id,
+            'ChangedAt': changed_at,
+        })
+    return records
+
+# Function to append change records with one multi-row insert in the caller's transaction
+def write_change_log(session, records):
+    if records:
+        session.execute(insert(ChangeLog.__table__).values(records))
+
+# Function to read the changes after `after_id`, oldest first. Consumers keep the last Id they processed.
+# Ids are handed out when a writer inserts but become visible when it commits, so with concurrent writers
+# (the scheduler next to backfill workers or a replay) Id 11 can be readable while Id 10 is still in an open
+# transaction; a consumer that moved past 11 would never see 10. Reading therefore stops before the first
+# gap whose following change is younger than `settle_seconds`: the gap is either filled by then or was a
+# rolled-back write. This relies on the writers' clocks being roughly in step with the reader's.
+def get_changes(session, after_id=0, table_name=None, limit=1000, settle_seconds=CHANGE_LOG_SETTLE_SECONDS):
+    settled_before = datetime.now() - timedelta(seconds=settle_seconds)
+    last_id = after_id
+    for change_id, changed_at in (
+        session.query(ChangeLog.Id, ChangeLog.ChangedAt)
+        .filter(ChangeLog.Id > after_id)
+        .order_by(ChangeLog.Id)
+        .limit(limit)
+    ):
+        if change_id != last_id + 1 and changed_at > settled_before:
+            break
+        last_id = change_id
+    if last_id == after_id:
+        return []
+
+    query = session.query(ChangeLog).filter(ChangeLog.Id > after_id, ChangeLog.Id <= last_id)
+    if table_name is not None:
+        query = query.filter(ChangeLog.TableName == table_name)
+    return query.order_by(ChangeLog.Id).all()
@@ -0,0 +1,51 @@
+import uuid
+import logging
+from datetime import datetime
+from models import SyncRun
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Function to record the start of a sync run and return its run id
+def start_run(session, endpoint, start_date, start_offset=0):
+    now = datetime.now()
+    run = SyncRun(
+        RunId=uuid.uuid4().hex,
+        Endpoint=endpoint,
+        StartDate=start_date,
+        NextOffset=start_offset,
+        Status='running',
+        StartedAt=now,
+        UpdatedAt=now,
+    )
+    session.add(run)
+    session.commit()
+    return run.RunId
+
+# Function to find the most recent run of an endpoint if it never completed
+def get_unfinished_run(session, endpoint):
+    run = (
+        session.query(SyncRun)
+        .filter(SyncRun.Endpoint == endpoint)
+        .order_by(SyncRun.StartedAt.desc())
+        .first()
+    )
+    if run is None or run.Status == 'completed':
+        return None
+    return run
+
+# Function to move a run's checkpoint past a page; committed together with that page's rows by the caller
+def record_checkpoint(session, run_id, next_offset, watermark=None):
+    values = {'NextOffset': next_offset, 'UpdatedAt': datetime.now()}
+    if watermark is not None:
+        values['LastSeenDate'] = watermark
+    session.query(SyncRun).filter(SyncRun.RunId == run_id).update(values, synchronize_session=False)
+
+# Function to mark a run as completed, stopped or failed
+def finish_run(session, run_id, status):
+    session.query(SyncRun).filter(SyncRun.RunId == run_id).update(
+        {'Status': status, 'UpdatedAt': datetime.now()}, synchronize_session=False
+    )
+    session.commit()
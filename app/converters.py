@@ -0,0 +1,113 @@
+import logging
+from datetime import datetime
+from sqlalchemy import DateTime, Float, Integer, JSON
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Typed coercions applied to a single API value. Empty strings are stored as NULL for every type.
+def _to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_integer(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
+def _to_scalar(value):
+    # Nested values only fit JSON columns; flatten_nested_json never mapped them onto scalar columns either
+    if isinstance(value, (dict, list)):
+        return _SKIP
+    return value
+
+def _to_json(value):
+    return value
+
+# Marker for a value that must not be written at all
+_SKIP = object()
+
+
+def _get_coercion(column):
+    if isinstance(column.type, DateTime):
+        return _to_datetime
+    if isinstance(column.type, Float):
+        return _to_float
+    if isinstance(column.type, Integer):
+        return _to_integer
+    if isinstance(column.type, JSON):
+        return _to_json
+    return _to_scalar
+
+
+# Function to walk a nested path such as ('item', 'cost') or ('Team', '0', 'id') the way flatten_nested_json named keys
+def _get_nested(item, path):
+    value = item
+    for part in path:
+        if isinstance(value, dict):
+            if part not in value:
+                return _SKIP
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _SKIP
+    return value
+
+
+# Function to build a converter turning one raw API record into a row for `table`.
+# Only mapped columns are extracted; keys missing from the record are left out of the row.
+def build_converter(table):
+    fields = []
+    for column in table.__table__.columns:
+        path = tuple(column.name.split('_')) if '_' in column.name else None
+        fields.append((column.name, path, _get_coercion(column)))
+
+    def convert(item):
+        row = {}
+        for name, path, coerce in fields:
+            if name in item:
+                value = item[name]
+            elif path is not None:
+                value = _get_nested(item, path)
+                if value is _SKIP:
+                    continue
+            else:
+                continue
+
+            if value == '' or value is None:
+                row[name] = None
+                continue
+            value = coerce(value)
+            if value is not _SKIP:
+                row[name] = value
+        return row
+
+    return convert
+
+
+_converters = {}
+
+
+# Function to get the cached converter for a model
+def get_converter(table):
+    converter = _converters.get(table)
+    if converter is None:
+        converter = _converters[table] = build_converter(table)
+    return converter
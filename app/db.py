@@ -0,0 +1,121 @@
+import os
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+DB_USER = os.getenv('MYSQL_USER')
+DB_PASSWORD = os.getenv('MYSQL_PASSWORD')
+DB_HOST = os.getenv('MYSQL_HOST')
+DB_NAME = os.getenv('MYSQL_DATABASE')
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Define the database URL; DATABASE_URL overrides the MySQL settings, e.g. to point at SQLite locally
+DATABASE_URL = os.getenv('DATABASE_URL') or f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+
+# Connection pool settings. Recycle below MySQL's wait_timeout so idle connections are never stale,
+# and pre-ping so a restarted MySQL container does not fail the first query.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '5'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+# Times a page transaction is retried after MySQL picked it as a deadlock victim or a lock wait timed out
+DB_DEADLOCK_RETRIES = int(os.getenv('DB_DEADLOCK_RETRIES', '3'))
+# MySQL error codes for a deadlock and a lock wait timeout; both roll the statement or transaction back
+RETRYABLE_ERRORS = (1213, 1205)
+
+_engine = None
+_session_factory = None
+_lock = threading.Lock()
+# Stand-ins for advisory locks on databases without them (SQLite)
+_local_locks = {}
+
+
+# Function to get the process-wide engine, creating it on first use
+def get_engine():
+    global _engine
+    with _lock:
+        if _engine is None:
+            if DATABASE_URL.startswith('sqlite'):
+                _engine = create_engine(DATABASE_URL)
+            else:
+                _engine = create_engine(
+                    DATABASE_URL,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=True,
+                )
+        return _engine
+
+# Function to get the sessionmaker bound to the shared engine
+def get_session_factory():
+    global _session_factory
+    engine = get_engine()
+    with _lock:
+        if _session_factory is None:
+            _session_factory = sessionmaker(bind=engine)
+        return _session_factory
+
+# Function to create any missing tables; called explicitly by the entry points that write
+def init_schema(engine=None):
+    from models import Base
+
+    Base.metadata.create_all(engine or get_engine())
+
+# Function to hold a named advisory lock for the duration of a `with` block, yielding whether it was acquired.
+# On MySQL GET_LOCK is seen by every process using the database and is released if the connection dies;
+# on SQLite the lock only covers this process.
+@contextmanager
+def advisory_lock(name, timeout=0):
+    engine = get_engine()
+    if engine.dialect.name != 'mysql':
+        with _lock:
+            lock = _local_locks.setdefault(name, threading.Lock())
+        acquired = lock.acquire(timeout=timeout) if timeout else lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+        return
+
+    with engine.connect() as conn:
+        acquired = conn.execute(text("SELECT GET_LOCK(:name, :timeout)"), {'name': name, 'timeout': timeout}).scalar() == 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text("SELECT RELEASE_LOCK(:name)"), {'name': name})
+
+# Function to run `work(session)` and commit it, retrying the whole transaction when MySQL rolls it back
+# as a deadlock victim or after a lock wait timeout. Parallel backfill windows and workers write
+# neighbouring keys and shared rollup rows, so an occasional deadlock is expected rather than a failure.
+# `work` must only touch the database, since it may run more than once. Returns what `work` returned.
+def run_transaction(session, work, retries=DB_DEADLOCK_RETRIES):
+    attempt = 0
+    while True:
+        try:
+            result = work(session)
+            session.commit()
+            return result
+        except OperationalError as e:
+            session.rollback()
+            code = e.orig.args[0] if e.orig is not None and e.orig.args else None
+            if code not in RETRYABLE_ERRORS or attempt >= retries:
+                raise
+            attempt += 1
+            delay = random.uniform(0.05, 0.2) * 2 ** attempt
+            logger.warning(f"Transaction rolled back by MySQL error {code}, retry {attempt}/{retries} in {delay:.2f}s")
+            time.sleep(delay)
@@ -0,0 +1,208 @@
+import os
+import csv
+import json
+import time
+import argparse
+import logging
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from sqlalchemy import JSON, DateTime, Float, Integer, func, select
+from viewer_queries import engine, schema_cache, build_table_query, stream_query_pages
+
+# Load environment variables
+load_dotenv()
+
+# Rows fetched from the server-side cursor and written per chunk
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '10000'))
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMATS = {'csv': '.csv', 'jsonl': '.jsonl', 'parquet': '.parquet'}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+# Function to render a JSON column value as text; drivers that do not decode JSON hand over strings already
+def _to_json_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, default=_json_default)
+
+
+class CsvWriter:
+    def __init__(self, path, columns, table):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+        self.json_positions = [i for i, name in enumerate(columns) if isinstance(table.c[name].type, JSON)]
+
+    def write(self, rows):
+        for row in rows:
+            row = list(row)
+            for i in self.json_positions:
+                row[i] = _to_json_text(row[i])
+            self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonLinesWriter:
+    def __init__(self, path, columns, table):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.columns = columns
+        self.json_positions = [i for i, name in enumerate(columns) if isinstance(table.c[name].type, JSON)]
+
+    def write(self, rows):
+        lines = []
+        for row in rows:
+            row = list(row)
+            # Keep JSON columns nested rather than as escaped strings
+            for i in self.json_positions:
+                if isinstance(row[i], str):
+                    try:
+                        row[i] = json.loads(row[i])
+                    except ValueError:
+                        pass
+            lines.append(json.dumps(dict(zip(self.columns, row)), default=_json_default))
+        self.file.write('\n'.join(lines) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    # JSON columns are stored as JSON text: their shapes differ from row to row, which Parquet cannot type
+    def __init__(self, path, columns, table):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        self.pa = pa
+        self.columns = columns
+        self.types = [table.c[name].type for name in columns]
+        self.schema = pa.schema([(name, self._arrow_type(column_type)) for name, column_type in zip(columns, self.types)])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def _arrow_type(self, column_type):
+        if isinstance(column_type, DateTime):
+            return self.pa.timestamp('us')
+        if isinstance(column_type, Integer):
+            return self.pa.int64()
+        if isinstance(column_type, Float):
+            return self.pa.float64()
+        return self.pa.string()
+
+    def write(self, rows):
+        arrays = []
+        for i, column_type in enumerate(self.types):
+            values = [row[i] for row in rows]
+            if isinstance(column_type, JSON):
+                values = [_to_json_text(value) for value in values]
+            elif self.schema.field(i).type == self.pa.string():
+                values = [value if value is None or isinstance(value, str) else str(value) for value in values]
+            arrays.append(self.pa.array(values, type=self.schema.field(i).type))
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {'csv': CsvWriter, 'jsonl': JsonLinesWriter, 'parquet': ParquetWriter}
+
+
+# Function to split a table into `parts` ranges of its single-column primary key.
+# Boundaries are read from the key index, so every part is an indexed range scan.
+def get_key_ranges(table, parts):
+    primary_key = list(table.primary_key.columns)
+    if parts <= 1 or len(primary_key) != 1:
+        return [(None, None)]
+    key = primary_key[0]
+    with engine.connect() as conn:
+        total = conn.execute(select(func.count()).select_from(table)).scalar()
+        step = total // parts
+        if step == 0:
+            return [(None, None)]
+        bounds = [conn.execute(select(key).order_by(key).offset(step * i).limit(1)).scalar() for i in range(1, parts)]
+    bounds = [None] + bounds + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+# Function to export the rows of one key range to `path`, one chunk at a time
+def export_range(table_name, path, fmt, selected_columns, filters, key_range, chunk_size):
+    query, columns = build_table_query(table_name, selected_columns, filters)
+    table = schema_cache.get_table(table_name)
+    low, high = key_range
+    if low is not None:
+        query = query.where(list(table.primary_key.columns)[0] >= low)
+    if high is not None:
+        query = query.where(list(table.primary_key.columns)[0] < high)
+
+    writer = WRITERS[fmt](path, columns, table)
+    rows = 0
+    try:
+        for chunk in stream_query_pages(query, chunk_size):
+            writer.write(chunk)
+            rows += len(chunk)
+    finally:
+        writer.close()
+    return rows
+
+# Function to export a table (optionally projected and filtered) to CSV, JSON Lines or Parquet.
+# With workers > 1 the table is split by primary key and each worker writes its own part file.
+def export_table(table_name, output, fmt='csv', selected_columns=None, filters='', workers=1, chunk_size=EXPORT_CHUNK_SIZE):
+    # Reflect once up front so the workers share the cached table
+    table = schema_cache.get_table(table_name)
+    key_ranges = get_key_ranges(table, workers)
+    if workers > 1 and len(key_ranges) == 1:
+        logger.info(f"{table_name} cannot be split by primary key, exporting with one worker")
+
+    if len(key_ranges) == 1:
+        paths = [output]
+    else:
+        stem, ext = os.path.splitext(output)
+        paths = [f"{stem}-part{i:03d}{ext or FORMATS[fmt]}" for i in range(len(key_ranges))]
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(key_ranges)) as executor:
+        futures = [
+            executor.submit(export_range, table_name, path, fmt, selected_columns, filters, key_range, chunk_size)
+            for path, key_range in zip(paths, key_ranges)
+        ]
+        rows = sum(future.result() for future in futures)
+    elapsed = time.monotonic() - started
+
+    size = sum(os.path.getsize(path) for path in paths)
+    logger.info(
+        f"Exported {rows} rows of {table_name} to {', '.join(paths)} in {elapsed:.2f}s "
+        f"({rows / elapsed if elapsed else 0:.0f} rows/s, {size / 1024 / 1024 / elapsed if elapsed else 0:.1f} MB/s)"
+    )
+    return rows, paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a table to CSV, JSON Lines or Parquet")
+    parser.add_argument('table', help="Table to export, e.g. jobs-test-1")
+    parser.add_argument('--output', help="Output file (default: <table>.<format>)")
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('--columns', help="Comma-separated column names or indices (default: all)")
+    parser.add_argument('--where', default='', help="Filters separated by ';', e.g. \"Status = Done; JobDateTime >= 2024-01-01\"")
+    parser.add_argument('--workers', type=int, default=1, help="Export primary-key ranges in parallel, one part file each")
+    parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    output = args.output or f"{args.table}{FORMATS[args.format]}"
+    try:
+        export_table(args.table, output, args.format, args.columns, args.where, args.workers, args.chunk_size)
+    except (RuntimeError, ValueError) as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
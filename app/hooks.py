@@ -0,0 +1,25 @@
+# Registry of write hooks: functions called with (session, table, rows) after bulk_upsert has
+# written the inserted or changed rows of a page, inside the same transaction. They keep tables
+# derived from the synced records up to date without another pass over the data.
+# Hooks registered with needs_old_rows=True are also given a dict of the previously stored rows
+# by UUID (new records are absent from it).
+
+WRITE_HOOKS = {}
+OLD_ROW_HOOKS = set()
+
+
+# Function to register a hook for every page written to `table`
+def register_write_hook(table, hook, needs_old_rows=False):
+    hooks = WRITE_HOOKS.setdefault(table, [])
+    if hook not in hooks:
+        hooks.append(hook)
+    if needs_old_rows:
+        OLD_ROW_HOOKS.add(hook)
+
+# Function to run the hooks registered for `table`
+def run_write_hooks(session, table, rows, old_rows=None):
+    for hook in WRITE_HOOKS.get(table, []):
+        if hook in OLD_ROW_HOOKS:
+            hook(session, table, rows, old_rows or {})
+        else:
+            hook(session, table, rows)
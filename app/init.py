@@ -1,8 +1,7 @@
 import os
 import logging
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from db import get_session_factory, init_schema
 from models import Jobs, Leads
 from utils import fetch_data_in_batches
 from datetime import datetime, timedelta
@@ -11,27 +10,11 @@ from dateutil.relativedelta import relativedelta
 # Load environment variables
 load_dotenv()
 API_TOKEN = os.getenv('API_TOKEN')
-DB_USER = os.getenv('MYSQL_USER')
-DB_PASSWORD = os.getenv('MYSQL_PASSWORD')
-DB_HOST = os.getenv('MYSQL_HOST')
-DB_NAME = os.getenv('MYSQL_DATABASE')
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Define the database URL
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
-
-
-# Set up the database connection
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
-
-# Create the table if it does not exist
-from models import Base
-Base.metadata.create_all(engine)
-
 
 def get_date_six_months_ago():
     # Get the current date
@@ -44,7 +27,9 @@ def get_date_six_months_ago():
 
 
 if __name__ == "__main__":
-    session = Session()
+    # Create the tables if they do not exist
+    init_schema()
+    session = get_session_factory()()
     
     # Example variables for date and start offset
     six_months_ago = get_date_six_months_ago()
@@ -0,0 +1,106 @@
+import argparse
+import logging
+from sqlalchemy import tuple_
+from db import get_session_factory, init_schema
+from models import Jobs, JobLineItem
+from hooks import register_write_hook
+from upserts import upsert_rows
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Function to turn a job's LineItems JSON into job-line-items rows.
+# Items are keyed by their Workiz id; items without one (or repeating one) fall back to their position.
+def explode_line_items(job_uuid, line_items):
+    rows = []
+    seen = set()
+    for position, item in enumerate(line_items or []):
+        if not isinstance(item, dict):
+            continue
+        item_id = item.get('Id') or item.get('id') or item.get('ItemId')
+        item_id = str(item_id) if item_id not in (None, '') else f"#{position}"
+        if item_id in seen:
+            item_id = f"{item_id}#{position}"
+        seen.add(item_id)
+        rows.append({
+            'JobUUID': job_uuid,
+            'ItemId': item_id,
+            'Name': item.get('Name') or None,
+            'Quantity': _to_float(item.get('Quantity')),
+            'Price': _to_float(item.get('Price')),
+            'Cost': _to_float(item.get('Cost')),
+        })
+    return rows
+
+# Write hook for Jobs: upsert the line items of every written job and delete the ones it no longer has.
+# Jobs written without a LineItems key keep their stored items.
+def sync_line_items(session, table, rows):
+    jobs = [row for row in rows if 'LineItems' in row]
+    if not jobs:
+        return
+
+    item_rows = []
+    for job in jobs:
+        item_rows.extend(explode_line_items(job['UUID'], job['LineItems']))
+    current = {(row['JobUUID'], row['ItemId']) for row in item_rows}
+
+    stored = session.query(JobLineItem.JobUUID, JobLineItem.ItemId).filter(
+        JobLineItem.JobUUID.in_([job['UUID'] for job in jobs])
+    )
+    removed = sorted(key for key in map(tuple, stored) if key not in current)
+    if removed:
+        session.query(JobLineItem).filter(
+            tuple_(JobLineItem.JobUUID, JobLineItem.ItemId).in_(removed)
+        ).delete(synchronize_session=False)
+    if item_rows:
+        # In key order, so concurrent writers lock rows in the same order
+        item_rows.sort(key=lambda row: (row['JobUUID'], row['ItemId']))
+        upsert_rows(session, JobLineItem.__table__, item_rows, {'JobUUID', 'ItemId'})
+
+# Function to rebuild job-line-items from the LineItems stored on every job, `batch_size` jobs per transaction.
+# Needed once for jobs written before the hook existed: a backfill skips jobs whose content is unchanged.
+def rebuild_line_items(session, batch_size=1000):
+    jobs = 0
+    after = None
+    while True:
+        query = session.query(Jobs.UUID, Jobs.LineItems)
+        if after is not None:
+            query = query.filter(Jobs.UUID > after)
+        batch = [{'UUID': uuid, 'LineItems': line_items} for uuid, line_items in query.order_by(Jobs.UUID).limit(batch_size)]
+        if not batch:
+            break
+        sync_line_items(session, Jobs, batch)
+        session.commit()
+        jobs += len(batch)
+        after = batch[-1]['UUID']
+    count = session.query(JobLineItem).count()
+    logger.info(f"Rebuilt job-line-items from {jobs} jobs: {count} items")
+    return count
+
+
+# Keep job-line-items in step with Jobs.LineItems on every write
+register_write_hook(Jobs, sync_line_items)
+
+
+def main():
+    argparse.ArgumentParser(description="Rebuild job-line-items from the LineItems stored on every job").parse_args()
+
+    init_schema()
+    session = get_session_factory()()
+    try:
+        rebuild_line_items(session)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
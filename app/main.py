@@ -1,37 +1,23 @@
 import os
+import argparse
 import logging
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
-from models import Jobs, Leads
-from utils import fetch_data_in_batches
+from db import get_session_factory, init_schema
+from sync import run_sync
+from metrics import METRICS_PORT, start_metrics_server
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 
 # Load environment variables
 load_dotenv()
 API_TOKEN = os.getenv('API_TOKEN')
-DB_USER = os.getenv('MYSQL_USER')
-DB_PASSWORD = os.getenv('MYSQL_PASSWORD')
-DB_HOST = os.getenv('MYSQL_HOST')
-DB_NAME = os.getenv('MYSQL_DATABASE')
+# Days to re-fetch before the stored watermark on incremental runs
+SYNC_OVERLAP_DAYS = int(os.getenv('SYNC_OVERLAP_DAYS', '2'))
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Define the database URL
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
-
-
-# Set up the database connection
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
-
-# Create the table if it does not exist
-from models import Base
-Base.metadata.create_all(engine)
-
 
 def get_date_six_months_ago():
     # Get the current date
@@ -44,17 +30,24 @@ def get_date_six_months_ago():
 
 
 if __name__ == "__main__":
-    session = Session()
-    
-    # Example variables for date and start offset
-    six_months_ago = get_date_six_months_ago()
-    start_offset = 0
-    
-    # Fetch and save job data from multiple endpoints
-    fetch_data_in_batches(API_TOKEN, 'job/all', six_months_ago, start_offset, Jobs, session)
-
-    fetch_data_in_batches(API_TOKEN, 'lead/all', six_months_ago, start_offset, Leads, session)
-
-    
-    session.close()
-
+    parser = argparse.ArgumentParser(
+        description="Sync Workiz jobs and leads into MySQL",
+        epilog="Incremental runs (the default) fetch records created since the stored CreatedDate watermark minus "
+               "SYNC_OVERLAP_DAYS, because the API's start_date filters on creation date. Status changes and other "
+               "updates to records created earlier are NOT fetched by them; run with --full (or let scheduler.py run "
+               "its periodic full resync) to pick those up.",
+    )
+    parser.add_argument('--full', action='store_true',
+                        help="Ignore the stored watermark and resync the last six months, picking up updates to older records")
+    parser.add_argument('--resume', action='store_true', help="Continue unfinished runs from their last committed offset")
+    args = parser.parse_args()
+
+    # Expose metrics over HTTP while the run is in progress; METRICS_FILE is written after each endpoint
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+
+    # Create the tables if they do not exist
+    init_schema()
+
+    # Sync every registered endpoint concurrently, each with its own session and rate budget
+    run_sync(API_TOKEN, get_session_factory(), get_date_six_months_ago(), full=args.full, overlap_days=SYNC_OVERLAP_DAYS, resume=args.resume)
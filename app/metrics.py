@@ -0,0 +1,148 @@
+import os
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Where to expose metrics: a text file rewritten after every run and/or a tiny HTTP endpoint
+METRICS_FILE = os.getenv('METRICS_FILE')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+
+# Metric name -> (type, help text). Every metric is labelled by endpoint.
+METRICS = {
+    'workiz_api_request_seconds': ('summary', 'Time from sending an API request to receiving the response headers'),
+    'workiz_api_responses_total': ('counter', 'API responses by HTTP status'),
+    'workiz_api_bytes_received_total': ('counter', 'Response body bytes received from the API, before decompression'),
+    'workiz_rate_limit_wait_seconds_total': ('counter', 'Time spent waiting on the rate limiter, including Retry-After pauses'),
+    'workiz_rate_limit_throttled_total': ('counter', 'HTTP 429 responses from the API'),
+    'workiz_convert_seconds': ('summary', 'Time spent converting a page of records to rows'),
+    'workiz_db_write_seconds': ('summary', 'Time spent upserting and committing a page'),
+    'workiz_rows_received_total': ('counter', 'Records received from the API'),
+    'workiz_rows_written_total': ('counter', 'Rows inserted or changed in the database'),
+    'workiz_sync_errors_total': ('counter', 'Sync runs that stopped on an error'),
+    'workiz_sync_duration_seconds': ('gauge', 'Wall clock time of the last sync run'),
+    'workiz_sync_rows_per_second': ('gauge', 'Records received per second in the last sync run'),
+    'workiz_sync_last_success_timestamp_seconds': ('gauge', 'Unix time the last sync run completed'),
+}
+
+
+class SyncMetrics:
+    # Thread-safe in-process registry rendered in the Prometheus text format
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, name, endpoint, labels):
+        return name, (('endpoint', endpoint),) + tuple(sorted((labels or {}).items()))
+
+    def inc(self, name, endpoint, value=1, labels=None):
+        key = self._key(name, endpoint, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name, endpoint, value, labels=None):
+        with self.lock:
+            self.values[self._key(name, endpoint, labels)] = value
+
+    # Summaries keep a running sum and count
+    def observe(self, name, endpoint, value, labels=None):
+        key = self._key(name, endpoint, labels)
+        with self.lock:
+            total, count = self.values.get(key, (0.0, 0))
+            self.values[key] = (total + value, count + 1)
+
+    def get(self, name, endpoint, labels=None, since=None):
+        key = self._key(name, endpoint, labels)
+        with self.lock:
+            value = self.values.get(key)
+        if isinstance(value, tuple):
+            value = value[0]
+        value = value or 0
+        if since:
+            previous = since.get(key) or 0
+            value -= previous[0] if isinstance(previous, tuple) else previous
+        return value
+
+    # Function to copy the current values so a later summary can report just one run
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+    def render(self):
+        with self.lock:
+            values = dict(self.values)
+        lines = []
+        for name, (metric_type, help_text) in METRICS.items():
+            series = sorted((labels, value) for (metric, labels), value in values.items() if metric == name)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in series:
+                label_text = ','.join(f'{key}="{value}"' for key, value in labels)
+                if metric_type == 'summary':
+                    lines.append(f"{name}_sum{{{label_text}}} {value[0]:.6f}")
+                    lines.append(f"{name}_count{{{label_text}}} {value[1]}")
+                else:
+                    lines.append(f"{name}{{{label_text}}} {value}")
+        return '\n'.join(lines) + '\n'
+
+    # Function to write the metrics atomically so a scraper never reads a half-written file
+    def write_file(self, path=METRICS_FILE):
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    # Function to summarise one endpoint in a single log line, counting only what happened after `since`
+    def summary(self, endpoint, since=None):
+        key = self._key('workiz_api_request_seconds', endpoint, None)
+        with self.lock:
+            request_seconds, requests = self.values.get(key, (0.0, 0))
+        if since and key in since:
+            request_seconds -= since[key][0]
+            requests -= since[key][1]
+        return (
+            f"Endpoint {endpoint}: {self.get('workiz_rows_received_total', endpoint, since=since)} records in "
+            f"{self.get('workiz_sync_duration_seconds', endpoint):.1f}s "
+            f"({self.get('workiz_sync_rows_per_second', endpoint):.1f} records/s); "
+            f"API {requests} requests {request_seconds:.1f}s, "
+            f"{self.get('workiz_api_bytes_received_total', endpoint, since=since) / 1024:.0f} KiB; "
+            f"rate limit wait {self.get('workiz_rate_limit_wait_seconds_total', endpoint, since=since):.1f}s; "
+            f"convert {self.get('workiz_convert_seconds', endpoint, since=since):.1f}s; "
+            f"DB write {self.get('workiz_db_write_seconds', endpoint, since=since):.1f}s; "
+            f"errors {self.get('workiz_sync_errors_total', endpoint, since=since)}"
+        )
+
+
+# Shared registry used by the fetcher
+sync_metrics = SyncMetrics()
+
+
+# Function to serve the shared registry on /metrics from a background thread
+def start_metrics_server(port=METRICS_PORT, registry=sync_metrics):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Serving metrics on port {server.server_port}")
+    return server
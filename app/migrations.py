@@ -0,0 +1,62 @@
+import argparse
+import logging
+from sqlalchemy import inspect, text
+from db import get_engine, init_schema
+from models import Base
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Built-in migrator: create_all only creates missing tables, so indexes declared on existing
+# tables are added here. On MySQL they are built with online DDL, so reads and the sync's
+# writes continue while an index is created.
+
+
+# Function to list declared indexes that are missing from existing tables
+def get_missing_indexes(engine):
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        missing.extend(index for index in sorted(table.indexes, key=lambda index: index.name) if index.name not in existing)
+    return missing
+
+# Function to create one index without blocking writes where the database supports it
+def create_index(engine, index):
+    if engine.dialect.name == 'mysql':
+        preparer = engine.dialect.identifier_preparer
+        columns = ', '.join(preparer.quote(column.name) for column in index.columns)
+        statement = (
+            f"CREATE INDEX {preparer.quote(index.name)} ON {preparer.format_table(index.table)} ({columns}) "
+            f"ALGORITHM=INPLACE LOCK=NONE"
+        )
+        with engine.begin() as conn:
+            conn.execute(text(statement))
+    else:
+        index.create(bind=engine)
+
+# Function to bring the schema up to date: create missing tables, then missing indexes
+def migrate(engine=None, dry_run=False):
+    engine = engine or get_engine()
+    if not dry_run:
+        init_schema(engine)
+    missing = get_missing_indexes(engine)
+    for index in missing:
+        columns = ', '.join(column.name for column in index.columns)
+        if dry_run:
+            logger.info(f"Would create index {index.name} on {index.table.name} ({columns})")
+            continue
+        logger.info(f"Creating index {index.name} on {index.table.name} ({columns})")
+        create_index(engine, index)
+    return missing
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create missing tables and indexes")
+    parser.add_argument('--dry-run', action='store_true', help="Only list the indexes that would be created")
+    args = parser.parse_args()
+    migrate(dry_run=args.dry_run)
@@ -1,19 +1,5 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, JSON
+from sqlalchemy import Column, Index, Integer, String, Text, Float, Numeric, DateTime, JSON
 from sqlalchemy.ext.declarative import declarative_base
-import os
-from dotenv import load_dotenv
-
-
-# Load environment variables
-load_dotenv()
-API_TOKEN = os.getenv('API_TOKEN')
-DB_USER = os.getenv('MYSQL_USER')
-DB_PASSWORD = os.getenv('MYSQL_PASSWORD')
-DB_HOST = os.getenv('MYSQL_HOST')
-DB_NAME = os.getenv('MYSQL_DATABASE')
-
-# Define the database URL
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
 
 Base = declarative_base()
 
@@ -60,6 +46,29 @@ class Jobs(Base):
     CreatedBy = Column(String(255))
     Address = Column(String(255))
 
+    # Dashboard filters: date ranges alone or narrowed by status/service area, client history, recent changes
+    __table_args__ = (
+        Index('ix_jobs_jobdatetime', 'JobDateTime'),
+        Index('ix_jobs_createddate', 'CreatedDate'),
+        Index('ix_jobs_laststatusupdate', 'LastStatusUpdate'),
+        Index('ix_jobs_status_jobdatetime', 'Status', 'JobDateTime'),
+        Index('ix_jobs_servicearea_jobdatetime', 'ServiceArea', 'JobDateTime'),
+        Index('ix_jobs_clientid_jobdatetime', 'ClientId', 'JobDateTime'),
+    )
+
+class JobLineItem(Base):
+    __tablename__ = 'job-line-items'
+    JobUUID = Column(String(50), primary_key=True)
+    ItemId = Column(String(50), primary_key=True)
+    Name = Column(String(255))
+    Quantity = Column(Float)
+    Price = Column(Float)
+    Cost = Column(Float)
+
+    __table_args__ = (
+        Index('ix_job_line_items_name', 'Name'),
+    )
+
 class Leads(Base):
     __tablename__ = 'leads-test-2'
     UUID = Column(String(50), primary_key=True)
@@ -95,6 +104,116 @@ class Leads(Base):
     LeadNotes = Column(Text)
     Team = Column(JSON)  # Assuming Team is stored as JSON
 
-# Create the table if it does not exist
-Base.metadata.create_all(create_engine(DATABASE_URL))
+    __table_args__ = (
+        Index('ix_leads_createddate', 'CreatedDate'),
+        Index('ix_leads_leaddatetime', 'LeadDateTime'),
+        Index('ix_leads_status_createddate', 'Status', 'CreatedDate'),
+        Index('ix_leads_clientid', 'ClientId'),
+    )
+
+class RecordHash(Base):
+    __tablename__ = 'record_hashes'
+    TableName = Column(String(100), primary_key=True)
+    UUID = Column(String(50), primary_key=True)
+    Hash = Column(String(40))  # SHA-1 of the normalised record last written
+
+class SyncState(Base):
+    __tablename__ = 'sync_state'
+    Endpoint = Column(String(100), primary_key=True)
+    LastStartDate = Column(String(10))  # start_date of the last successful run (YYYY-MM-DD)
+    LastOffset = Column(Integer)
+    LastSeenDate = Column(DateTime)  # Highest CreatedDate seen; the API's start_date filters on it
+    LastSyncAt = Column(DateTime)
+
+class SyncRun(Base):
+    __tablename__ = 'sync_runs'
+    RunId = Column(String(32), primary_key=True)
+    Endpoint = Column(String(100))
+    StartDate = Column(String(10))  # start_date passed to the API (YYYY-MM-DD)
+    NextOffset = Column(Integer)  # Offset of the first page not yet committed
+    LastSeenDate = Column(DateTime)  # Watermark of the pages committed so far
+    Status = Column(String(20))  # running, stopped, failed or completed
+    StartedAt = Column(DateTime)
+    UpdatedAt = Column(DateTime)
+
+class BackfillWindow(Base):
+    __tablename__ = 'backfill_windows'
+    Endpoint = Column(String(100), primary_key=True)
+    WindowStart = Column(String(10), primary_key=True)  # First CreatedDate day in the window (YYYY-MM-DD)
+    WindowEnd = Column(String(10))  # First CreatedDate day after the window
+    NextOffset = Column(Integer)  # Offset of the first page not yet committed
+    Status = Column(String(20))  # pending, running, failed or completed
+    UpdatedAt = Column(DateTime)
+
+
+# Rollups maintained by the sync (see rollups.py). Day is a YYYY-MM-DD string and missing dimension
+# values are stored as '' so they can be part of the key. Dimension columns are ROLLUP_KEY_LENGTH
+# characters so the four-column key stays inside InnoDB's 3072-byte index limit with utf8mb4; longer
+# source values (the synced columns hold 255) are cut to that length, so values sharing their first
+# 191 characters are counted together. Money columns are DECIMAL so repeated increments do not drift.
+ROLLUP_KEY_LENGTH = 191
+
+class JobDailyRollup(Base):
+    __tablename__ = 'job_daily_rollup'
+    Day = Column(String(10), primary_key=True)  # Day of JobDateTime, or CreatedDate for unscheduled jobs
+    ServiceArea = Column(String(ROLLUP_KEY_LENGTH), primary_key=True)
+    JobType = Column(String(ROLLUP_KEY_LENGTH), primary_key=True)
+    JobSource = Column(String(ROLLUP_KEY_LENGTH), primary_key=True)
+    Jobs = Column(Integer, nullable=False, default=0)
+    JobTotalPrice = Column(Numeric(14, 2), nullable=False, default=0)
+    SubTotal = Column(Numeric(14, 2), nullable=False, default=0)
+    JobAmountDue = Column(Numeric(14, 2), nullable=False, default=0)
+    ItemCost = Column(Numeric(14, 2), nullable=False, default=0)
+    TechCost = Column(Numeric(14, 2), nullable=False, default=0)
+
+class LeadDailyRollup(Base):
+    __tablename__ = 'lead_daily_rollup'
+    Day = Column(String(10), primary_key=True)  # Day of CreatedDate
+    JobType = Column(String(ROLLUP_KEY_LENGTH), primary_key=True)
+    JobSource = Column(String(ROLLUP_KEY_LENGTH), primary_key=True)
+    Status = Column(String(ROLLUP_KEY_LENGTH), primary_key=True)
+    Leads = Column(Integer, nullable=False, default=0)
+
+# Append-only log of inserts and real updates written by bulk_upsert, for consumers that tail
+# changes by Id instead of diffing the tables
+class ChangeLog(Base):
+    __tablename__ = 'change_log'
+    Id = Column(Integer, primary_key=True, autoincrement=True)
+    TableName = Column(String(100), nullable=False)
+    UUID = Column(String(50), nullable=False)
+    Operation = Column(String(10), nullable=False)  # insert or update
+    ChangedColumns = Column(JSON)  # Names of the columns whose value changed (all written columns for inserts)
+    OldStatus = Column(String(255))
+    NewStatus = Column(String(255))
+    RunId = Column(String(32))  # sync_runs.RunId, or backfill-<window start> for backfill windows
+    ChangedAt = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_change_log_table_id', 'TableName', 'Id'),
+        Index('ix_change_log_uuid', 'UUID'),
+    )
+
+# Backfill windows as a work queue shared by several worker processes (see work_queue.py).
+# Progress within a window stays in backfill_windows; this table only records who owns it.
+class WorkTask(Base):
+    __tablename__ = 'work_tasks'
+    Endpoint = Column(String(100), primary_key=True)
+    WindowStart = Column(String(10), primary_key=True)
+    WindowEnd = Column(String(10))
+    Status = Column(String(20))  # pending, claimed, completed or failed
+    WorkerId = Column(String(100))  # host-pid of the worker holding the claim
+    HeartbeatAt = Column(DateTime)  # Refreshed while the claim is held; stale claims are taken over
+    Attempts = Column(Integer, nullable=False, default=0)  # Claims so far; also guards claims against races
+    UpdatedAt = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_work_tasks_status_heartbeat', 'Status', 'HeartbeatAt'),
+    )
 
+# Processes that call the API (the scheduler and backfill workers), so each can take an equal share of
+# the account's rate budget (see rate_share.py). Rows whose heartbeat stopped are ignored.
+class ApiClient(Base):
+    __tablename__ = 'api_clients'
+    ClientId = Column(String(100), primary_key=True)  # host-pid of the process
+    Role = Column(String(20))  # scheduler or worker
+    HeartbeatAt = Column(DateTime)
@@ -0,0 +1,62 @@
+import os
+import queue
+import logging
+import threading
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Pages allowed to wait between the fetcher and the writer before the fetcher blocks
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '4'))
+
+# Markers passed through the queue after the last page
+_DONE = object()
+
+
+class _ProducerError:
+    def __init__(self, error):
+        self.error = error
+
+
+# Function to run `produce` (an iterable of pages) in a fetcher thread and `consume(page)` in the calling thread.
+# The bounded queue applies backpressure to the fetcher; pages fetched before a fetch error are still
+# written before the error is re-raised, and a write error stops the fetcher at its next page.
+def run_pipeline(produce, consume, queue_size=PIPELINE_QUEUE_SIZE, name='pipeline'):
+    pages = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item):
+        # Re-check the stop flag while blocked so a failed writer never leaves the fetcher hanging
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetcher():
+        try:
+            for page in produce():
+                if not put(page):
+                    return
+            put(_DONE)
+        except Exception as e:
+            put(_ProducerError(e))
+
+    thread = threading.Thread(target=fetcher, name=f"{name}-fetcher", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _ProducerError):
+                raise item.error
+            consume(item)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        thread.join()
@@ -0,0 +1,180 @@
+import os
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Requests allowed per window by default, and how long the window is in seconds. The default keeps the
+# original pace of one page every 30 seconds with no burst, which is known not to get the account locked out;
+# raise both once the account's actual Workiz limit is known.
+RATE_LIMIT_REQUESTS = int(os.getenv('WORKIZ_RATE_LIMIT_REQUESTS', '1'))
+RATE_LIMIT_WINDOW = float(os.getenv('WORKIZ_RATE_LIMIT_WINDOW', '30'))
+# Retry settings for throttled (429) and server error (5xx) responses
+MAX_RETRIES = int(os.getenv('WORKIZ_MAX_RETRIES', '5'))
+BACKOFF_BASE = float(os.getenv('WORKIZ_BACKOFF_BASE', '2'))
+BACKOFF_MAX = float(os.getenv('WORKIZ_BACKOFF_MAX', '300'))
+
+
+class RateLimiter:
+    # Token bucket holding up to `requests` tokens, refilled evenly over `window` seconds.
+    # The refill rate halves when the API throttles us and creeps back up on success.
+    # A `parent` limiter (e.g. the global API budget) must also grant a token for every request.
+    def __init__(self, requests=RATE_LIMIT_REQUESTS, window=RATE_LIMIT_WINDOW, name='workiz', parent=None):
+        self.name = name
+        self.parent = parent
+        self.capacity = float(requests)
+        self.max_rate = requests / window
+        # Configured budget, kept so a share of it can be taken with set_share
+        self.full_capacity = self.capacity
+        self.full_rate = self.max_rate
+        self.min_rate = self.max_rate / 16
+        self.rate = self.max_rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+        self.metrics = {
+            'requests': 0,
+            'wait_seconds': 0.0,
+            'throttled': 0,
+            'retries': 0,
+            'backoff_seconds': 0.0,
+        }
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    # Block until a token is available and take it
+    def acquire(self):
+        waited = self._acquire_own()
+        if self.parent is not None:
+            parent_waited = self.parent.acquire()
+            with self.lock:
+                self.metrics['wait_seconds'] += parent_waited
+            waited += parent_waited
+        return waited
+
+    def _acquire_own(self):
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    delay = pause
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    self.metrics['requests'] += 1
+                    self.metrics['wait_seconds'] += waited
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    # Called on a successful response: recover towards the configured rate
+    def on_success(self):
+        if self.parent is not None:
+            self.parent.on_success()
+        with self.lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    # Called on a 429: slow down, drain the bucket and pause every caller for `retry_after` seconds
+    def on_throttled(self, retry_after=None):
+        # A 429 means the account-wide budget is exhausted too
+        if self.parent is not None:
+            self.parent.on_throttled(retry_after)
+        with self.lock:
+            self._refill()
+            self.metrics['throttled'] += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+        logger.warning(f"Rate limiter {self.name}: throttled, rate now {self.rate * 60:.2f} requests/min")
+
+    # Called when several processes share the account's budget: use `share` (0-1] of the configured rate.
+    # The current adaptive rate is kept within the new bounds.
+    def set_share(self, share):
+        with self.lock:
+            self._refill()
+            self.max_rate = self.full_rate * share
+            self.min_rate = self.max_rate / 16
+            self.rate = min(max(self.rate, self.min_rate), self.max_rate)
+            self.capacity = max(1.0, self.full_capacity * share)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def record_backoff(self, seconds):
+        if self.parent is not None:
+            self.parent.record_backoff(seconds)
+        with self.lock:
+            self.metrics['retries'] += 1
+            self.metrics['backoff_seconds'] += seconds
+
+    def get_metrics(self):
+        with self.lock:
+            return dict(self.metrics, rate_per_minute=self.rate * 60)
+
+
+# Function to read a Retry-After header given either in seconds or as an HTTP date
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+# Function to send a request through the limiter, retrying 429 and 5xx responses
+def request_with_backoff(send, limiter, max_retries=MAX_RETRIES):
+    attempt = 0
+    while True:
+        limiter.acquire()
+        response = send()
+        if response.status_code != 429 and response.status_code < 500:
+            limiter.on_success()
+            return response
+
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if attempt >= max_retries:
+            return response
+        # A streamed response holds its pooled connection until it is closed
+        response.close()
+
+        # The limiter holds every caller until Retry-After has passed, so only back off ourselves without one
+        honour_retry_after = retry_after is not None and response.status_code == 429
+        if honour_retry_after:
+            delay = retry_after
+        else:
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+            # Jitter so concurrent fetchers do not retry in lockstep
+            delay += random.uniform(0, delay / 10)
+        if response.status_code == 429:
+            limiter.on_throttled(retry_after if honour_retry_after else None)
+
+        logger.warning(f"Rate limiter {limiter.name}: HTTP {response.status_code}, retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+        limiter.record_backoff(delay)
+        if not honour_retry_after:
+            time.sleep(delay)
+        attempt += 1
+
+
+# Shared limiter used by every endpoint the fetcher calls
+api_rate_limiter = RateLimiter()
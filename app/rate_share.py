@@ -0,0 +1,40 @@
+import os
+import logging
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from models import ApiClient
+from rate_limiter import api_rate_limiter
+
+# Load environment variables
+load_dotenv()
+# Seconds between heartbeats of a process using the API, and after which a silent one stops counting
+API_CLIENT_HEARTBEAT_SECONDS = int(os.getenv('API_CLIENT_HEARTBEAT_SECONDS', '15'))
+API_CLIENT_STALE_SECONDS = int(os.getenv('API_CLIENT_STALE_SECONDS', '90'))
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Function to record that a process is using the API
+def heartbeat_client(session, client_id, role):
+    session.merge(ApiClient(ClientId=client_id, Role=role, HeartbeatAt=datetime.now()))
+    session.commit()
+
+# Function to drop a process that stopped using the API, so the others take its share straight away
+def remove_client(session, client_id):
+    session.query(ApiClient).filter(ApiClient.ClientId == client_id).delete(synchronize_session=False)
+    session.commit()
+
+# Function to count the processes with a live heartbeat
+def count_clients(session, stale_after=API_CLIENT_STALE_SECONDS):
+    stale_before = datetime.now() - timedelta(seconds=stale_after)
+    return session.query(ApiClient).filter(ApiClient.HeartbeatAt >= stale_before).count()
+
+# Function to heartbeat this process and take its share of the account-wide rate budget.
+# Returns the number of processes sharing it.
+def update_rate_share(session, client_id, role, limiter=api_rate_limiter):
+    heartbeat_client(session, client_id, role)
+    clients = max(1, count_clients(session))
+    limiter.set_share(1 / clients)
+    return clients
@@ -0,0 +1,218 @@
+import os
+import glob
+import argparse
+import logging
+from datetime import datetime, timedelta
+from db import get_session_factory, init_schema, advisory_lock, run_transaction
+from models import BackfillWindow
+from utils import save_data_to_db, bulk_upsert
+from converters import get_converter
+from checkpoints import get_unfinished_run, record_checkpoint
+from sync_state import get_watermark_column, get_page_watermark
+from backfill import filter_window
+from spool import SPOOL_DIR, read_spool, remove_spool_files
+from sync import ENDPOINTS
+from work_queue import WORK_STALE_SECONDS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Function to load every page of a spool file with bulk upserts, committing page by page.
+# Pages already in the database are skipped by the content hashes, so a file can be replayed again safely.
+def replay_file(path, Session, run_id):
+    session = Session()
+    totals = {'pages': 0, 'added': 0, 'changed': 0, 'unchanged': 0}
+    try:
+        for page in read_spool(path):
+            config = ENDPOINTS.get(page['endpoint'])
+            if config is None:
+                logger.warning(f"{path}: skipping page of unknown endpoint {page['endpoint']}")
+                continue
+            added, changed, unchanged = save_data_to_db(page['data'], config['table'], session, commit=False, run_id=run_id)
+            session.commit()
+            totals['pages'] += 1
+            totals['added'] += added
+            totals['changed'] += changed
+            totals['unchanged'] += unchanged
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    logger.info(f"Replayed {path}: {totals}")
+    return totals
+
+# Function to expand directories into the spool files they hold, oldest first
+def find_spool_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.jsonl.gz'))))
+        else:
+            files.append(path)
+    return files
+
+# Function to group spool files by the sync run or backfill window their pages belong to.
+# Files written before pages were tagged with their run are left out.
+def group_spool_files(files):
+    groups = {}
+    for path in files:
+        page = next(read_spool(path), None)
+        if page is None:
+            continue
+        if not page.get('run_id') and not page.get('window_start'):
+            logger.warning(f"{path}: pages are not tagged with a run, pass the file to replay.py to load it")
+            continue
+        groups.setdefault((page['endpoint'], page.get('run_id'), page.get('window_start')), []).append(path)
+    return groups
+
+
+# Function to load the spooled pages of one run from its checkpoint on, committing each page together
+# with `advance(offset, watermark)`, where the watermark is the highest CreatedDate loaded so far starting
+# from `watermark`. Files are the run's attempts, oldest first; an offset spooled by several attempts
+# is loaded from the latest, and loading stops at the first offset missing from the spool.
+def load_pages(session, paths, table, next_offset, advance, keep=None, run_id=None, watermark=None):
+    latest = {}
+    for index, path in enumerate(paths):
+        for page in read_spool(path):
+            latest[page['offset']] = index
+    # Offsets only increase within a file, so each file is read once even when the attempts interleave
+    readers = [read_spool(path) for path in paths]
+
+    convert = get_converter(table)
+    watermark_column = get_watermark_column(table)
+    totals = {'pages': 0, 'added': 0, 'changed': 0, 'unchanged': 0}
+    try:
+        while next_offset in latest:
+            offset = next_offset
+            page = next(page for page in readers[latest[offset]] if page['offset'] == offset)
+            rows = [convert(item) for item in page['data']]
+            if keep is not None:
+                rows = keep(rows)
+            page_watermark = get_page_watermark(rows, watermark_column)
+            if page_watermark is not None and (watermark is None or page_watermark > watermark):
+                watermark = page_watermark
+
+            def write(session):
+                counts = bulk_upsert(rows, table, session, commit=False, run_id=run_id)
+                advance(offset, watermark)
+                return counts
+
+            added, changed, unchanged = run_transaction(session, write)
+            next_offset += 1
+            totals['pages'] += 1
+            totals['added'] += added
+            totals['changed'] += changed
+            totals['unchanged'] += unchanged
+    finally:
+        for reader in readers:
+            reader.close()
+    return totals
+
+# Function to replay the spool of a sync run if it is still the run its endpoint would resume.
+# Spools of runs that completed or were superseded by a newer run hold stale pages and are deleted.
+def replay_run(Session, endpoint, run_id, paths):
+    with advisory_lock(f"workiz-sync:{endpoint}") as acquired:
+        if not acquired:
+            logger.warning(f"Endpoint {endpoint}: a sync is running, skipping the spool of run {run_id}")
+            return None
+        session = Session()
+        try:
+            run = get_unfinished_run(session, endpoint)
+            if run is None or run.RunId != run_id:
+                logger.info(f"Endpoint {endpoint}: run {run_id} completed or was superseded, deleting its spool")
+                remove_spool_files(paths)
+                return None
+            start_offset = run.NextOffset
+            # The watermark moves on with the replayed pages, so a resumed run that completes stores the right one
+            totals = load_pages(session, paths, ENDPOINTS[endpoint]['table'], start_offset,
+                                lambda offset, watermark: record_checkpoint(session, run_id, offset + 1, watermark),
+                                run_id=run_id, watermark=run.LastSeenDate)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    logger.info(f"Endpoint {endpoint}: replayed run {run_id} from offset {start_offset}: {totals}")
+    return totals
+
+# Function to replay the spool of a backfill window that has not completed.
+# Windows a worker wrote to within WORK_STALE_SECONDS are skipped, since it may still be running them.
+def replay_window(Session, endpoint, window_start, paths):
+    session = Session()
+    try:
+        window = session.query(BackfillWindow).filter(
+            BackfillWindow.Endpoint == endpoint, BackfillWindow.WindowStart == window_start
+        ).first()
+        if window is None or window.Status == 'completed':
+            logger.info(f"Endpoint {endpoint}: window {window_start} completed, deleting its spool")
+            remove_spool_files(paths)
+            return None
+        if window.Status == 'running' and window.UpdatedAt > datetime.now() - timedelta(seconds=WORK_STALE_SECONDS):
+            logger.warning(f"Endpoint {endpoint}: window {window_start} is being backfilled, skipping its spool")
+            return None
+        start_offset, window_end = window.NextOffset, window.WindowEnd
+
+        def advance(offset, watermark):
+            session.query(BackfillWindow).filter(
+                BackfillWindow.Endpoint == endpoint, BackfillWindow.WindowStart == window_start
+            ).update({'NextOffset': offset + 1, 'UpdatedAt': datetime.now()}, synchronize_session=False)
+
+        totals = load_pages(session, paths, ENDPOINTS[endpoint]['table'], start_offset, advance,
+                            keep=lambda rows: filter_window(rows, window_start, window_end),
+                            run_id=f"backfill-{window_start}")
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    logger.info(f"Endpoint {endpoint}: replayed window {window_start} from offset {start_offset}: {totals}")
+    return totals
+
+# Function to replay every unfinished run spooled in `directory`, oldest spool first, and delete the
+# spools of runs that no longer need them. Runs stay unfinished; their next sync resumes after the replayed pages.
+def replay_pending(Session, directory):
+    groups = group_spool_files(find_spool_files([directory]))
+    for (endpoint, run_id, window_start), paths in sorted(groups.items(), key=lambda item: min(map(os.path.getmtime, item[1]))):
+        if endpoint not in ENDPOINTS:
+            logger.warning(f"Skipping the spool of unknown endpoint {endpoint}")
+        elif window_start:
+            replay_window(Session, endpoint, window_start, paths)
+        else:
+            replay_run(Session, endpoint, run_id, paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load spooled API pages into the database without calling the API",
+        epilog="Without paths, the spools in SPOOL_DIR of sync runs and backfill windows that did not finish are "
+               "loaded from their checkpoints, and spools of finished or superseded runs are deleted. Files given "
+               "explicitly are loaded in full, even where newer data has been written since.",
+    )
+    parser.add_argument('paths', nargs='*', help="Spool files or directories to load in full")
+    parser.add_argument('--delete', action='store_true', help="Delete each file given once it has been replayed")
+    args = parser.parse_args()
+
+    if not args.paths and not SPOOL_DIR:
+        parser.error("no spool files given and SPOOL_DIR is not set")
+    files = find_spool_files(args.paths)
+    if args.paths and not files:
+        parser.error("no spool files found")
+
+    init_schema()
+    Session = get_session_factory()
+    if not args.paths:
+        replay_pending(Session, SPOOL_DIR)
+        return
+
+    run_id = f"replay-{datetime.now().strftime('%Y%m%dT%H%M%S')}"
+    for path in files:
+        replay_file(path, Session, run_id)
+        if args.delete:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
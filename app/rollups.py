@@ -0,0 +1,151 @@
+import argparse
+import logging
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import func, insert, or_, select, tuple_
+from db import get_session_factory, init_schema
+from models import Jobs, Leads, JobDailyRollup, LeadDailyRollup, ROLLUP_KEY_LENGTH
+from hooks import register_write_hook
+from upserts import increment_rows
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# How each synced table is rolled up: the columns giving the day (first non-empty wins), the
+# dimension columns, the counter column and the summed rollup columns with their source columns.
+ROLLUPS = {
+    Jobs: {
+        'rollup': JobDailyRollup,
+        'day_columns': ('JobDateTime', 'CreatedDate'),
+        'dimensions': ('ServiceArea', 'JobType', 'JobSource'),
+        'count': 'Jobs',
+        'measures': {
+            'JobTotalPrice': 'JobTotalPrice',
+            'SubTotal': 'SubTotal',
+            'JobAmountDue': 'JobAmountDue',
+            'ItemCost': 'item_cost',
+            'TechCost': 'tech_cost',
+        },
+    },
+    Leads: {
+        'rollup': LeadDailyRollup,
+        'day_columns': ('CreatedDate',),
+        'dimensions': ('JobType', 'JobSource', 'Status'),
+        'count': 'Leads',
+        'measures': {},
+    },
+}
+CENT = Decimal('0.01')
+
+
+def _day(value):
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+def _number(value):
+    try:
+        return Decimal(str(value or 0)).quantize(CENT)
+    except (ArithmeticError, ValueError):
+        return Decimal(0)
+
+# Function to get the rollup key and values a record contributes, or None when it has no day
+def get_contribution(spec, row):
+    day = next((row[column] for column in spec['day_columns'] if row.get(column)), None)
+    if day is None:
+        return None
+    key = (_day(day),) + tuple(str(row.get(column) or '')[:ROLLUP_KEY_LENGTH] for column in spec['dimensions'])
+    values = [1] + [_number(row.get(source)) for source in spec['measures'].values()]
+    return key, values
+
+# Write hook for Jobs and Leads: move the contribution of every written record from its old rollup
+# row to its new one. Only the rollup rows of the days and keys in the page are touched.
+def update_rollups(session, table, rows, old_rows):
+    spec = ROLLUPS[table]
+    deltas = {}
+
+    def add(row, sign):
+        contribution = get_contribution(spec, row)
+        if contribution is None:
+            return
+        key, values = contribution
+        totals = deltas.setdefault(key, [0] * len(values))
+        for i, value in enumerate(values):
+            totals[i] += sign * value
+
+    for row in rows:
+        old = old_rows.get(row['UUID'])
+        if old is not None:
+            add(old, -1)
+            # Fields missing from the written record keep their stored value
+            row = {**old, **row}
+        add(row, 1)
+
+    deltas = {key: values for key, values in deltas.items() if any(values)}
+    if not deltas:
+        return
+
+    rollup = spec['rollup']
+    key_columns = ('Day',) + spec['dimensions']
+    value_columns = (spec['count'],) + tuple(spec['measures'])
+    increment_rows(
+        session,
+        rollup.__table__,
+        # In key order, so concurrent writers lock shared rollup rows in the same order
+        [dict(zip(key_columns + value_columns, key + tuple(values))) for key, values in sorted(deltas.items())],
+        set(key_columns),
+    )
+
+    # Rows whose last record moved away are dropped rather than left at zero
+    emptied = sorted(key for key, values in deltas.items() if values[0] < 0)
+    if emptied:
+        key_attributes = [getattr(rollup, column) for column in key_columns]
+        session.query(rollup).filter(
+            tuple_(*key_attributes).in_(emptied), getattr(rollup, spec['count']) <= 0
+        ).delete(synchronize_session=False)
+
+# Function to rebuild a rollup from scratch with one GROUP BY over the synced table.
+# Needed once for records written before the rollups existed; the hook keeps it current afterwards.
+def rebuild_rollup(session, table):
+    spec = ROLLUPS[table]
+    rollup = spec['rollup']
+    day_columns = [getattr(table, column) for column in spec['day_columns']]
+    day = func.date(func.coalesce(*day_columns) if len(day_columns) > 1 else day_columns[0])
+    dimensions = [func.substr(func.coalesce(getattr(table, column), ''), 1, ROLLUP_KEY_LENGTH) for column in spec['dimensions']]
+    query = select(
+        day,
+        *dimensions,
+        func.count(),
+        *[func.coalesce(func.sum(func.round(getattr(table, source), 2)), 0) for source in spec['measures'].values()],
+    ).where(
+        or_(*[column.isnot(None) for column in day_columns])
+    ).group_by(day, *dimensions)
+
+    columns = ['Day', *spec['dimensions'], spec['count'], *spec['measures']]
+    session.query(rollup).delete(synchronize_session=False)
+    session.execute(insert(rollup.__table__).from_select(columns, query))
+    session.commit()
+    count = session.query(rollup).count()
+    logger.info(f"Rebuilt {rollup.__tablename__}: {count} rows")
+    return count
+
+# Keep the daily reporting rollups in step with Jobs and Leads
+for table in ROLLUPS:
+    register_write_hook(table, update_rollups, needs_old_rows=True)
+
+
+def main():
+    argparse.ArgumentParser(description="Rebuild the job and lead rollup tables from the synced tables").parse_args()
+
+    init_schema()
+    session = get_session_factory()()
+    try:
+        for table in ROLLUPS:
+            rebuild_rollup(session, table)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
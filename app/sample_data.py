@@ -0,0 +1,134 @@
+import random
+import string
+from datetime import datetime, timedelta
+
+# Realistic generated Workiz job/lead payloads, used by the benchmarks and the local API simulator
+
+STATUSES = ['Submitted', 'Pending', 'In progress', 'Done', 'Canceled']
+SUB_STATUSES = ['', 'Waiting for parts', 'Scheduled', 'Need to reschedule']
+SERVICE_AREAS = ['North', 'South', 'East', 'West', 'Downtown']
+JOB_TYPES = ['Repair', 'Installation', 'Maintenance', 'Estimate', 'Service call']
+JOB_SOURCES = ['Google', 'Yelp', 'Referral', 'Website', 'Repeat customer', '']
+LEAD_STATUSES = ['New', 'Contacted', 'Quoted', 'Converted', 'Lost']
+CITIES = [('Austin', 'TX', '78701'), ('Denver', 'CO', '80202'), ('Phoenix', 'AZ', '85004'), ('Miami', 'FL', '33101')]
+ITEM_NAMES = ['Labor', 'Filter', 'Capacitor', 'Thermostat', 'Service fee', 'Copper line', 'Refrigerant']
+TAGS = ['vip', 'warranty', 'follow-up', 'commercial', 'residential', 'urgent']
+START_DATE = datetime(2022, 9, 14)
+
+
+def _uuid(rng):
+    return ''.join(rng.choice(string.ascii_uppercase + string.digits) for _ in range(6))
+
+def _date(value):
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+def _phone(rng):
+    return f"{rng.randint(200, 999)}{rng.randint(200, 999)}{rng.randint(1000, 9999)}"
+
+def _contact(rng, index):
+    city, state, postal_code = rng.choice(CITIES)
+    return {
+        'Phone': _phone(rng),
+        'SecondPhone': rng.choice(['', _phone(rng)]),
+        'PhoneExt': '',
+        'SecondPhoneExt': '',
+        'Email': f"client{index}@example.com",
+        'FirstName': rng.choice(['Ann', 'Bob', 'Carla', 'Dev', 'Eli']),
+        'LastName': rng.choice(['Smith', 'Jones', 'Garcia', 'Nguyen', 'Brown']),
+        'Company': rng.choice(['', 'Acme LLC', 'Globex']),
+        'Address': f"{rng.randint(1, 9999)} Main St",
+        'City': city,
+        'State': state,
+        'PostalCode': postal_code,
+        'Country': 'US',
+        'Unit': rng.choice(['', 'Apt 2', 'Suite 100']),
+        'Latitude': str(round(rng.uniform(25, 45), 6)),
+        'Longitude': str(round(rng.uniform(-120, -80), 6)),
+    }
+
+def _team(rng):
+    return [{'id': rng.randint(1, 50), 'Name': rng.choice(['Alex', 'Sam', 'Jo', 'Kim'])} for _ in range(rng.randint(0, 2))]
+
+
+# Function to generate one job record shaped like a job/all response item
+def generate_job(index, rng=None):
+    rng = rng or random.Random(index)
+    created = START_DATE + timedelta(minutes=index * 37)
+    scheduled = created + timedelta(days=rng.randint(0, 14), hours=rng.randint(8, 17))
+    line_items = [
+        {
+            'Id': rng.randint(1000, 99999),
+            'Name': rng.choice(ITEM_NAMES),
+            'Description': '',
+            'Quantity': rng.randint(1, 4),
+            'Price': round(rng.uniform(20, 500), 2),
+            'Cost': round(rng.uniform(5, 200), 2),
+            'Taxable': rng.choice([True, False]),
+        }
+        for _ in range(rng.randint(0, 6))
+    ]
+    sub_total = round(sum(item['Price'] * item['Quantity'] for item in line_items), 2)
+    team = _team(rng)
+    job = {
+        'UUID': _uuid(rng),
+        'SerialId': 1000 + index,
+        'JobDateTime': _date(scheduled),
+        'JobEndDateTime': rng.choice(['', _date(scheduled + timedelta(hours=2))]),
+        'CreatedDate': _date(created),
+        'JobTotalPrice': round(sub_total * 1.08, 2),
+        'JobAmountDue': rng.choice([0, round(sub_total * 1.08, 2)]),
+        'SubTotal': sub_total,
+        'item_cost': round(sum(item['Cost'] * item['Quantity'] for item in line_items), 2),
+        'tech_cost': round(rng.uniform(0, 150), 2),
+        'ClientId': rng.randint(1, 5000),
+        'Status': rng.choice(STATUSES),
+        'SubStatus': rng.choice(SUB_STATUSES),
+        'PaymentDueDate': '',
+        'LineItems': line_items,
+        'ServiceArea': rng.choice(SERVICE_AREAS),
+        'JobType': rng.choice(JOB_TYPES),
+        'JobNotes': rng.choice(['', 'Gate code 1234. Dog in the yard.', 'Call before arrival']),
+        'JobSource': rng.choice(JOB_SOURCES),
+        'Tags': rng.sample(TAGS, rng.randint(0, 3)),
+        'LastStatusUpdate': _date(created + timedelta(days=rng.randint(0, 30))),
+        'Team': team,
+        'TeamId': team[0]['id'] if team else '',
+        'TeamName': team[0]['Name'] if team else '',
+        'CreatedBy': rng.choice(['Office', 'Online booking']),
+        'CustomFields': {'Warranty': rng.choice(['', 'Yes', 'No']), 'Referral': ''},
+    }
+    job.update(_contact(rng, index))
+    return job
+
+
+# Function to generate one lead record shaped like a lead/all response item
+def generate_lead(index, rng=None):
+    rng = rng or random.Random(-index - 1)
+    created = START_DATE + timedelta(minutes=index * 53)
+    scheduled = created + timedelta(days=rng.randint(0, 10), hours=rng.randint(8, 17))
+    lead = {
+        'UUID': _uuid(rng),
+        'SerialId': 5000 + index,
+        'LeadDateTime': _date(scheduled),
+        'LeadEndDateTime': rng.choice(['', _date(scheduled + timedelta(hours=1))]),
+        'CreatedDate': _date(created),
+        'ClientId': rng.randint(1, 5000),
+        'Status': rng.choice(LEAD_STATUSES),
+        'SubStatus': rng.choice(SUB_STATUSES),
+        'PaymentDueDate': '',
+        'Comments': rng.choice(['', 'Wants a quote for a new unit']),
+        'JobType': rng.choice(JOB_TYPES),
+        'ReferralCompany': '',
+        'Timezone': 'US/Central',
+        'JobSource': rng.choice(JOB_SOURCES),
+        'LeadNotes': rng.choice(['', 'Prefers mornings']),
+        'Team': _team(rng),
+    }
+    lead.update(_contact(rng, index))
+    return lead
+
+
+# Function to generate a page of `records` items of the given kind ('job' or 'lead')
+def generate_page(kind, offset=0, records=100):
+    generate = generate_job if kind == 'job' else generate_lead
+    return [generate(offset * records + i) for i in range(records)]
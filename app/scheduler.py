@@ -0,0 +1,143 @@
+import os
+import time
+import socket
+import argparse
+import signal
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from db import get_session_factory, init_schema
+from sync import ENDPOINTS, sync_endpoint
+from metrics import METRICS_PORT, start_metrics_server
+from rate_share import API_CLIENT_HEARTBEAT_SECONDS, update_rate_share, remove_client
+from main import API_TOKEN, SYNC_OVERLAP_DAYS, get_date_six_months_ago
+
+# Load environment variables
+load_dotenv()
+# Seconds between incremental syncs of each endpoint, with per-endpoint overrides such as "job/all=900,lead/all=3600"
+SYNC_INTERVAL = int(os.getenv('SYNC_INTERVAL', '3600'))
+SYNC_INTERVALS = os.getenv('SYNC_INTERVALS', '')
+# Seconds between full six-month resyncs, which pick up updates to records created before the
+# incremental watermark (0 disables them); per-endpoint overrides work as for SYNC_INTERVALS
+SYNC_FULL_INTERVAL = int(os.getenv('SYNC_FULL_INTERVAL', '86400'))
+SYNC_FULL_INTERVALS = os.getenv('SYNC_FULL_INTERVALS', '')
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Function to read the sync interval of every registered endpoint
+def parse_intervals(text, default=SYNC_INTERVAL, setting='SYNC_INTERVALS'):
+    intervals = {endpoint: default for endpoint in ENDPOINTS}
+    for item in [item.strip() for item in text.split(',') if item.strip()]:
+        endpoint, _, seconds = item.partition('=')
+        if endpoint.strip() not in intervals:
+            raise ValueError(f"Unknown endpoint '{endpoint.strip()}' in {setting}")
+        intervals[endpoint.strip()] = int(seconds)
+    return intervals
+
+
+class Scheduler:
+    # Runs incremental syncs of each endpoint every `intervals[endpoint]` seconds in one long-lived
+    # process, so the engine's connection pool and the HTTP session stay open between runs.
+    # A sync still running when its next turn comes is not started again. Every `full_intervals[endpoint]`
+    # seconds the turn is a full six-month resync instead, since incremental runs miss updates to older records.
+    def __init__(self, api_token, Session, intervals, full_intervals=None, overlap_days=SYNC_OVERLAP_DAYS):
+        self.api_token = api_token
+        self.Session = Session
+        self.intervals = intervals
+        self.full_intervals = full_intervals or {}
+        self.overlap_days = overlap_days
+        self.stop = threading.Event()
+        self.next_run = {endpoint: 0.0 for endpoint in intervals}
+        now = time.monotonic()
+        self.next_full = {endpoint: now + seconds for endpoint, seconds in self.full_intervals.items() if seconds > 0}
+        self.running = {}
+        # Backfill workers running next to the scheduler split the account's rate budget with it
+        self.client_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.next_heartbeat = 0.0
+        self.clients = 1
+        self.executor = ThreadPoolExecutor(max_workers=len(intervals), thread_name_prefix='scheduler')
+
+    def run_endpoint(self, endpoint, full=False):
+        try:
+            if full:
+                logger.info(f"Endpoint {endpoint}: running the periodic full resync")
+            # Runs cut short by a shutdown are resumed from their checkpoint on the next turn; a full
+            # resync covers whatever an unfinished incremental run would have fetched, so it starts afresh
+            sync_endpoint(self.api_token, endpoint, self.Session, get_date_six_months_ago(), full=full,
+                          overlap_days=self.overlap_days, resume=not full, stop=self.stop)
+        except Exception as e:
+            logger.error(f"Endpoint {endpoint}: scheduled sync failed: {e}")
+        if not self.stop.is_set():
+            logger.info(f"Endpoint {endpoint}: next sync in {max(0, self.next_run[endpoint] - time.monotonic()):.0f}s")
+
+    # Function to ask the scheduler to stop; running syncs finish the pages they already fetched
+    def shutdown(self, signum=None, frame=None):
+        if not self.stop.is_set():
+            logger.info("Shutting down, waiting for running syncs to stop")
+        self.stop.set()
+
+    # Function to heartbeat the scheduler and take its share of the API budget
+    def update_rate_share(self):
+        session = self.Session()
+        try:
+            clients = update_rate_share(session, self.client_id, 'scheduler')
+            if clients != self.clients:
+                logger.info(f"{clients} processes now share the API budget, taking 1/{clients} of it")
+                self.clients = clients
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Rate share heartbeat failed: {e}")
+        finally:
+            session.close()
+
+    def run(self):
+        logger.info(f"Scheduling {', '.join(f'{endpoint} every {seconds}s' for endpoint, seconds in self.intervals.items())}; "
+                    f"full resyncs {', '.join(f'{endpoint} every {seconds}s' for endpoint, seconds in self.full_intervals.items() if seconds > 0) or 'disabled'}")
+        while not self.stop.is_set():
+            now = time.monotonic()
+            if self.next_heartbeat <= now:
+                self.next_heartbeat = now + API_CLIENT_HEARTBEAT_SECONDS
+                self.update_rate_share()
+            for endpoint, due in self.next_run.items():
+                future = self.running.get(endpoint)
+                if due <= now and (future is None or future.done()):
+                    self.next_run[endpoint] = now + self.intervals[endpoint]
+                    full = endpoint in self.next_full and self.next_full[endpoint] <= now
+                    if full:
+                        self.next_full[endpoint] = now + self.full_intervals[endpoint]
+                    self.running[endpoint] = self.executor.submit(self.run_endpoint, endpoint, full)
+            # Wake for the next heartbeat or due endpoint; overdue ones are re-checked every second until their run ends
+            self.stop.wait(max(1.0, min(self.next_heartbeat, *self.next_run.values()) - time.monotonic()))
+        self.executor.shutdown(wait=True)
+        session = self.Session()
+        try:
+            remove_client(session, self.client_id)
+        finally:
+            session.close()
+        logger.info("Scheduler stopped")
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(
+        description="Run incremental syncs of every endpoint on SYNC_INTERVAL(S) and full six-month resyncs on "
+                    "SYNC_FULL_INTERVAL(S) until stopped with SIGTERM",
+        epilog="Incremental syncs only fetch records created since the stored CreatedDate watermark (the API's "
+               "start_date filters on creation date), so updates to older records arrive with the full resyncs only.",
+    ).parse_args()
+
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+
+    # Create the tables once for the life of the process
+    init_schema()
+
+    scheduler = Scheduler(API_TOKEN, get_session_factory(), parse_intervals(SYNC_INTERVALS),
+                          parse_intervals(SYNC_FULL_INTERVALS, SYNC_FULL_INTERVAL, 'SYNC_FULL_INTERVALS'))
+    # Docker sends SIGTERM on stop; Ctrl+C sends SIGINT
+    signal.signal(signal.SIGTERM, scheduler.shutdown)
+    signal.signal(signal.SIGINT, scheduler.shutdown)
+    scheduler.run()
@@ -0,0 +1,139 @@
+import os
+import glob
+import gzip
+import json
+import logging
+from datetime import datetime
+
+# Directory fetched pages are spooled to before they are written to the database (spooling is off when unset)
+SPOOL_DIR = os.getenv('SPOOL_DIR')
+# Size after which a spool file is closed and a new one started
+SPOOL_MAX_BYTES = int(os.getenv('SPOOL_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class PageSpool:
+    # Write-ahead log of raw API pages: one JSON line per page, each appended as its own gzip member
+    # and fsynced, so a crash can at most lose the page being written. Concatenated members read
+    # back as one gzip stream. Pages carry the sync run or backfill window they belong to, so replay.py
+    # can resume it from its checkpoint; the files are discarded once that run completes.
+    def __init__(self, directory, endpoint, run_id=None, window_start=None, max_bytes=SPOOL_MAX_BYTES):
+        self.directory = directory
+        self.endpoint = endpoint
+        self.run_id = run_id
+        self.window_start = window_start
+        self.label = '-'.join(part for part in (endpoint, window_start or run_id) if part).replace('/', '_')
+        self.max_bytes = max_bytes
+        self.started = datetime.now().strftime("%Y%m%dT%H%M%S")
+        self.sequence = 0
+        self.path = None
+        # Files written so far, oldest first
+        self.paths = []
+        os.makedirs(directory, exist_ok=True)
+        self.rotate()
+
+    # Function to start a new spool file
+    def rotate(self):
+        self.sequence += 1
+        name = f"{self.label}-{self.started}-{os.getpid()}-{self.sequence:04d}.jsonl.gz"
+        self.path = os.path.join(self.directory, name)
+
+    # Function to start spooling a page whose records are written as they arrive, so a streamed page is
+    # never held in memory just to be spooled. Returns a SpooledPage to finish() or abort().
+    def start_page(self, start_date, offset):
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self.rotate()
+        if self.path not in self.paths:
+            self.paths.append(self.path)
+        header = json.dumps({
+            'endpoint': self.endpoint,
+            'run_id': self.run_id,
+            'window_start': self.window_start,
+            'start_date': start_date,
+            'offset': offset,
+            'fetched_at': datetime.now().isoformat(),
+        }, default=str)
+        return SpooledPage(self.path, header)
+
+    # Function to append one page and make it durable before returning
+    def append(self, start_date, offset, records):
+        page = self.start_page(start_date, offset)
+        try:
+            for record in records:
+                page.write(record)
+        except BaseException:
+            page.abort()
+            raise
+        page.finish()
+
+    # Function to delete the files of this spool's run once all its pages are committed, including
+    # those of earlier attempts at the same run or window, which the completed run fetched again
+    def discard(self):
+        if self.run_id or self.window_start:
+            paths = glob.glob(os.path.join(self.directory, f"{glob.escape(self.label)}-*.jsonl.gz"))
+        else:
+            paths = self.paths
+        remove_spool_files(paths)
+
+
+class SpooledPage:
+    # One page being appended to a spool file as its own gzip member. The page's JSON line is written
+    # record by record; abort() cuts the file back so a page that failed part way leaves nothing behind.
+    def __init__(self, path, header):
+        self.file = open(path, 'ab')
+        self.start = self.file.seek(0, os.SEEK_END)
+        self.gzip = gzip.GzipFile(fileobj=self.file, mode='wb')
+        # The header's closing brace is replaced by the data array
+        self.gzip.write((header[:-1] + ', "data": [').encode())
+        self.records = 0
+
+    def write(self, record):
+        self.gzip.write(((', ' if self.records else '') + json.dumps(record, default=str)).encode())
+        self.records += 1
+
+    # Function to end the page and make it durable before returning
+    def finish(self):
+        self.gzip.write(b']}\n')
+        self.gzip.close()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+    def abort(self):
+        try:
+            self.gzip.close()
+        finally:
+            self.file.truncate(self.start)
+            self.file.close()
+
+
+# Function to open the spool for a sync run or backfill window, or None when SPOOL_DIR is not set
+def open_spool(endpoint, run_id=None, window_start=None):
+    if not SPOOL_DIR:
+        return None
+    return PageSpool(SPOOL_DIR, endpoint, run_id, window_start)
+
+# Function to delete spool files, ignoring ones already gone
+def remove_spool_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+# Function to read the pages of a spool file in the order they were fetched.
+# A page cut short by a crash ends the file with a warning instead of an error.
+def read_spool(path):
+    with gzip.open(path, 'rt') as f:
+        try:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning(f"{path}: ignoring incomplete page at the end of the spool")
+                    return
+        except EOFError:
+            logger.warning(f"{path}: ignoring truncated page at the end of the spool")
@@ -2,26 +2,20 @@ import os
 import logging
 from dotenv import load_dotenv
 from prettytable import PrettyTable
-from sqlalchemy import create_engine, MetaData, Table
+from sqlalchemy import MetaData, Table
 from sqlalchemy.exc import SQLAlchemyError
+from db import get_engine
 
 # Load environment variables
 load_dotenv()
 API_TOKEN = os.getenv('API_TOKEN')
-DB_USER = os.getenv('MYSQL_USER')
-DB_PASSWORD = os.getenv('MYSQL_PASSWORD')
-DB_HOST = os.getenv('MYSQL_HOST')  # Example: "192.168.1.20:1231"
-DB_NAME = os.getenv('MYSQL_DATABASE')
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Define the database URL
-DATABASE_URL = f"mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
-
 # Create SQLAlchemy engine and MetaData
-engine = create_engine(DATABASE_URL)
+engine = get_engine()
 metadata = MetaData()
 
 metadata.bind = engine
@@ -2,63 +2,80 @@ import os
 import logging
 from dotenv import load_dotenv
 from prettytable import PrettyTable
-from sqlalchemy import create_engine, MetaData, Table, select
 from sqlalchemy.exc import SQLAlchemyError
+from viewer_queries import (PAGE_SIZE, schema_cache, fetch_all_tables, fetch_table_data, fetch_table_page,
+                            fetch_query_page, build_table_query)
 
 # Load environment variables
 load_dotenv()
 API_TOKEN = os.getenv('API_TOKEN')
-DB_USER = os.getenv('MYSQL_USER')
-DB_PASSWORD = os.getenv('MYSQL_PASSWORD')
-DB_HOST = os.getenv('MYSQL_HOST')  # Example: "192.168.1.20:1231"
-DB_NAME = os.getenv('MYSQL_DATABASE')
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Define the database URL
-DATABASE_URL = f"mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
-
-# Create SQLAlchemy engine and MetaData
-engine = create_engine(DATABASE_URL)
-metadata = MetaData()
-
-metadata.bind = engine
-
-# Function to fetch all tables
-def fetch_all_tables():
-    try:
-        metadata.reflect(bind=engine)
-        return sorted(metadata.tables.keys())
-    except SQLAlchemyError as e:
-        logger.error(f"Error fetching tables: {e}")
-        return []
-
-# Function to fetch table data
-def fetch_table_data(table_name, limit=None, selected_columns=None):
-    try:
-        conn = engine.connect()
-        table = Table(table_name, metadata, autoload=True, autoload_with=engine)
-        columns = table.columns.keys()
-
-        if selected_columns:
-            selected_columns = [columns[int(idx)] for idx in selected_columns.split(',') if idx.isdigit() and int(idx) < len(columns)]
-        else:
-            selected_columns = columns
-
-        if limit:
-            query = select([getattr(table.c, col) for col in selected_columns]).limit(limit)
+# Function to run a query built by build_table_query and page through its results
+# Every page is its own query, sorted by the primary key after the chosen order so pages do not overlap.
+def query_table(table_name, selected_columns=None, filters='', order_by='', limit=None, page_size=PAGE_SIZE):
+    query, columns = build_table_query(table_name, selected_columns, filters, order_by)
+    query = query.order_by(*schema_cache.get_table(table_name).primary_key.columns)
+    shown = 0
+    page_number = 1
+    while True:
+        rows = page_size if not limit else min(page_size, limit - shown)
+        data = fetch_query_page(query, shown, rows) if rows > 0 else []
+        if not data:
+            break
+        print(f"\nPage {page_number}")
+        display_table(data, columns)
+        shown += len(data)
+        page_number += 1
+        if len(data) < rows or input("[n]ext page, [q]uit: ").strip().lower() == 'q':
+            break
+    if not shown:
+        print("No rows match.")
+
+# Function to browse a whole table page by page with next/previous navigation.
+# Only one page is held in memory and the first page is shown as soon as it is read.
+def browse_table(table_name, selected_columns=None, page_size=PAGE_SIZE):
+    table = schema_cache.get_table(table_name)
+    if not table.primary_key.columns:
+        # Without a key pages are read with LIMIT/OFFSET, which gets slower the deeper it goes,
+        # so this mode only moves forward
+        query, columns = build_table_query(table_name, selected_columns)
+        page_number = 1
+        while True:
+            data = fetch_query_page(query, (page_number - 1) * page_size, page_size)
+            print(f"\nPage {page_number}")
+            display_table(data, columns)
+            if len(data) < page_size or input("[n]ext page, [q]uit: ").strip().lower() == 'q':
+                break
+            page_number += 1
+        return
+
+    # Key each displayed page started after, so [p]revious can re-read it
+    page_starts = [None]
+    data = None
+    while True:
+        if data is None:
+            data, columns, last_key = fetch_table_page(table_name, selected_columns, page_starts[-1], page_size)
+            print(f"\nPage {len(page_starts)}")
+            display_table(data, columns)
+
+        choice = input("[n]ext page, [p]revious page, [q]uit: ").strip().lower()
+        if choice == 'q':
+            break
+        elif choice == 'p':
+            if len(page_starts) > 1:
+                page_starts.pop()
+                data = None
+            else:
+                print("Already on the first page.")
+        elif len(data) < page_size:
+            print("No more rows.")
         else:
-            query = select([getattr(table.c, col) for col in selected_columns])
-
-        result = conn.execute(query)
-        data = result.fetchall()
-        conn.close()
-        return data, selected_columns
-    except SQLAlchemyError as e:
-        logger.error(f"Error fetching table data: {e}")
-        return [], []
+            page_starts.append(last_key)
+            data = None
 
 # Function to display table data
 def display_table(data, column_names):
@@ -83,6 +100,8 @@ def main():
             print("2. Show first N lines of a table")
             print("3. Show all lines of a table")
             print("4. Exit")
+            print("5. Refresh cached schema")
+            print("6. Query a table (filter, sort, choose columns)")
             choice = input("Choose an option: ")
 
             if choice == '1':
@@ -137,13 +156,11 @@ def main():
                             if columns_selection:
                                 selected_columns = [idx.strip() for idx in columns_selection.split(',') if idx.strip().isdigit()]
                                 if selected_columns:
-                                    data, column_names = fetch_table_data(table_name, selected_columns=','.join(selected_columns))
-                                    display_table(data, selected_columns)
+                                    browse_table(table_name, ','.join(selected_columns))
                                 else:
                                     print("No valid column indices provided.")
                             else:
-                                data, column_names = fetch_table_data(table_name)
-                                display_table(data, column_names)
+                                browse_table(table_name)
                         except SQLAlchemyError as se:
                             print(f"Error fetching table data: {se}")
                     else:
@@ -154,6 +171,29 @@ def main():
             elif choice == '4':
                 break
 
+            elif choice == '5':
+                schema_cache.refresh()
+                print("Schema cache cleared.")
+
+            elif choice == '6':
+                tables = fetch_all_tables()
+                table_name = input("\nEnter table name: ")
+                if table_name in tables:
+                    try:
+                        columns = schema_cache.get_table(table_name).columns.keys()
+                        print("Columns: " + ', '.join(f"{idx}:{name}" for idx, name in enumerate(columns)))
+                        columns_selection = input("Enter column indices (comma-separated) to display (leave blank for all): ").strip()
+                        filters = input("Filters, separated by ';' (e.g. Status = Done; JobDateTime >= 2024-01-01): ")
+                        order_by = input("Order by (e.g. JobDateTime desc, leave blank for none): ")
+                        limit = input("Maximum rows (leave blank for all): ").strip()
+                        query_table(table_name, columns_selection, filters, order_by, int(limit) if limit else None)
+                    except ValueError as ve:
+                        print(f"Invalid input: {ve}")
+                    except SQLAlchemyError as se:
+                        print(f"Error querying table: {se}")
+                else:
+                    print(f"Table {table_name} does not exist.")
+
             else:
                 print("Invalid option, please try again.")
 
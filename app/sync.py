@@ -0,0 +1,95 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from models import Jobs, Leads
+from utils import fetch_data_in_batches
+from rate_limiter import RateLimiter, api_rate_limiter, RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW
+from sync_state import get_incremental_start_date, update_sync_state
+from checkpoints import start_run, get_unfinished_run
+from db import advisory_lock
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Upper bound on endpoints synced at the same time
+SYNC_MAX_WORKERS = int(os.getenv('SYNC_MAX_WORKERS', '4'))
+
+# Registered Workiz endpoints, in registration order
+ENDPOINTS = {}
+
+
+# Function to register a Workiz endpoint and the model its records are stored in.
+# Each endpoint gets its own rate budget, which draws from the shared api_rate_limiter.
+# stream=True parses pages incrementally, for endpoints with large records.
+def register_endpoint(endpoint, table, requests=RATE_LIMIT_REQUESTS, window=RATE_LIMIT_WINDOW, stream=False):
+    ENDPOINTS[endpoint] = {
+        'table': table,
+        'limiter': RateLimiter(requests, window, name=endpoint, parent=api_rate_limiter),
+        'stream': stream,
+    }
+
+
+# Job pages carry LineItems and Tags, so they are streamed when STREAM_JOBS is set
+register_endpoint('job/all', Jobs, stream=os.getenv('STREAM_JOBS', '').lower() in ('1', 'true', 'yes'))
+register_endpoint('lead/all', Leads)
+
+
+# Function to sync one endpoint with its own session.
+# With resume=True an unfinished run continues from its last committed offset.
+# An advisory lock per endpoint keeps two processes from syncing the same endpoint at once;
+# returns None without syncing when another process holds it.
+def sync_endpoint(api_token, endpoint, Session, default_date, full=False, overlap_days=2, resume=False, stop=None):
+    with advisory_lock(f"workiz-sync:{endpoint}") as acquired:
+        if not acquired:
+            logger.warning(f"Endpoint {endpoint}: another sync is running, skipping")
+            return None
+        return _sync_endpoint(api_token, endpoint, Session, default_date, full, overlap_days, resume, stop)
+
+def _sync_endpoint(api_token, endpoint, Session, default_date, full, overlap_days, resume, stop):
+    config = ENDPOINTS[endpoint]
+    session = Session()
+    try:
+        run = get_unfinished_run(session, endpoint) if resume else None
+        if run is not None:
+            run_id, start_date, start_offset, watermark = run.RunId, run.StartDate, run.NextOffset, run.LastSeenDate
+            logger.info(f"Endpoint {endpoint}: resuming run {run_id} from start date {start_date}, offset {start_offset}")
+        else:
+            if full:
+                start_date = default_date
+            else:
+                start_date = get_incremental_start_date(session, endpoint, overlap_days, default_date)
+            start_offset, watermark = 0, None
+            run_id = start_run(session, endpoint, start_date)
+
+        result = fetch_data_in_batches(api_token, endpoint, start_date, start_offset, config['table'], session,
+                                       limiter=config['limiter'], stream=config['stream'], run_id=run_id, watermark=watermark, stop=stop)
+
+        # Only a run that reached the last page may move the watermark
+        if result['completed']:
+            update_sync_state(session, result)
+        elif result['stopped']:
+            logger.info(f"Endpoint {endpoint}: run {run_id} stopped, it will resume from offset {result['last_offset']}")
+        else:
+            logger.warning(f"Endpoint {endpoint}: run did not complete, sync state left unchanged")
+        return result
+    finally:
+        session.close()
+
+
+# Function to sync several endpoints concurrently, returning their results by endpoint
+def run_sync(api_token, Session, default_date, endpoints=None, full=False, overlap_days=2, resume=False, max_workers=SYNC_MAX_WORKERS):
+    endpoints = list(endpoints or ENDPOINTS)
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(endpoints))), thread_name_prefix='sync') as executor:
+        futures = {
+            endpoint: executor.submit(sync_endpoint, api_token, endpoint, Session, default_date, full, overlap_days, resume)
+            for endpoint in endpoints
+        }
+        for endpoint, future in futures.items():
+            try:
+                results[endpoint] = future.result()
+            except Exception as e:
+                logger.error(f"Endpoint {endpoint}: sync failed: {e}")
+                results[endpoint] = None
+    return results
@@ -0,0 +1,57 @@
+import logging
+from datetime import datetime, timedelta
+from models import SyncState
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Function to pick the column used as the high-water mark for a table.
+# The API's start_date filters on creation date, so the watermark has to be CreatedDate for jobs too:
+# an incremental run only sees records created since the watermark. Updates to older records
+# (e.g. a job's status changing) only arrive with a full resync, which the scheduler runs on its own interval.
+def get_watermark_column(table):
+    return 'CreatedDate'
+
+# Function to find the highest watermark value in a page of raw API records or converted rows
+def get_page_watermark(data, column):
+    watermark = None
+    for item in data:
+        value = item.get(column)
+        if not value:
+            continue
+        if not isinstance(value, datetime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                continue
+        if watermark is None or value > watermark:
+            watermark = value
+    return watermark
+
+# Function to work out where an incremental run should start
+def get_incremental_start_date(session, endpoint, overlap_days, default_date):
+    state = session.get(SyncState, endpoint)
+    if state is None or state.LastSeenDate is None:
+        logger.info(f"Endpoint {endpoint}: no sync state, starting from {default_date}")
+        return default_date
+
+    # Step back by the overlap so late-arriving updates around the watermark are picked up again
+    start_date = (state.LastSeenDate - timedelta(days=overlap_days)).strftime("%Y-%m-%d")
+    logger.info(f"Endpoint {endpoint}: resuming from watermark {state.LastSeenDate}, start date {start_date}")
+    return start_date
+
+# Function to persist the result of a successful run
+def update_sync_state(session, result):
+    state = session.get(SyncState, result['endpoint'])
+    if state is None:
+        state = SyncState(Endpoint=result['endpoint'])
+        session.add(state)
+
+    state.LastStartDate = result['start_date']
+    state.LastOffset = result['last_offset']
+    # Never move the watermark backwards, e.g. when a run saw no new records
+    if result['watermark'] is not None and (state.LastSeenDate is None or result['watermark'] > state.LastSeenDate):
+        state.LastSeenDate = result['watermark']
+    state.LastSyncAt = datetime.now()
+    session.commit()
@@ -0,0 +1,47 @@
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+
+# Function to build one multi-row upsert statement for the session's database.
+# MySQL gets INSERT ... ON DUPLICATE KEY UPDATE; SQLite (used by the local benchmarks) gets ON CONFLICT.
+def _build_upsert(session, table, group, keys, key_columns):
+    if session.get_bind().dialect.name == 'sqlite':
+        stmt = sqlite_insert(table).values(group)
+        update_columns = {key: stmt.excluded[key] for key in keys if key not in key_columns}
+        if update_columns:
+            return stmt.on_conflict_do_update(index_elements=list(key_columns), set_=update_columns)
+        return stmt.on_conflict_do_nothing()
+
+    stmt = insert(table).values(group)
+    update_columns = {key: stmt.inserted[key] for key in keys if key not in key_columns}
+    if update_columns:
+        return stmt.on_duplicate_key_update(update_columns)
+    return stmt.prefix_with('IGNORE')
+
+# Function to upsert rows into a Core table with multi-row INSERT ... ON DUPLICATE KEY UPDATE, returning affected rows
+def upsert_rows(session, table, rows, key_columns):
+    # Rows are grouped by key set so fields missing from a record keep their stored value, like merge() did
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    affected_rows = 0
+    for keys, group in groups.items():
+        affected_rows += session.execute(_build_upsert(session, table, group, keys, key_columns)).rowcount
+    return affected_rows
+
+# Function to add the value columns of `rows` onto the stored rows with the same key, inserting missing keys.
+# Used for counters and sums that are maintained by deltas rather than overwritten.
+def increment_rows(session, table, rows, key_columns):
+    value_columns = [key for key in rows[0] if key not in key_columns]
+    if session.get_bind().dialect.name == 'sqlite':
+        stmt = sqlite_insert(table).values(rows)
+        return session.execute(stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={key: table.c[key] + stmt.excluded[key] for key in value_columns},
+        )).rowcount
+
+    stmt = insert(table).values(rows)
+    return session.execute(stmt.on_duplicate_key_update(
+        {key: table.c[key] + stmt.inserted[key] for key in value_columns}
+    )).rowcount
@@ -1,24 +1,34 @@
+import json
 import time
+import hashlib
 from datetime import datetime
-import requests
+from sqlalchemy import select
 from sqlalchemy.orm import sessionmaker
 import logging
+from sync_state import get_watermark_column, get_page_watermark
+from rate_limiter import api_rate_limiter
+from api_client import get_client
+from pipeline import run_pipeline
+from converters import get_converter
+from models import RecordHash
+from checkpoints import record_checkpoint, finish_run
+from metrics import sync_metrics
+from hooks import run_write_hooks
+from upserts import upsert_rows, increment_rows
+# Imported for the write hooks they register, so every caller of bulk_upsert keeps line items and rollups current
+import line_items
+import rollups
+from spool import open_spool
+from db import run_transaction
+from change_log import build_change_records, write_change_log
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Function to fetch data from the API
-def fetch_data_from_api(api_token, endpoint, date, offset):
-    url = f"https://api.workiz.com/api/v1/{api_token}/{endpoint}/?start_date={date}&offset={offset}&records=100&only_open=false"
-    headers = {
-        'accept': '*/*'
-    }
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        response.raise_for_status()
+def fetch_data_from_api(api_token, endpoint, date, offset, limiter=api_rate_limiter):
+    return get_client(api_token).get_page(endpoint, date, offset, limiter=limiter)
 
 # Function to flatten nested JSON fields
 def flatten_nested_json_old(item, parent_key='', sep='_'):
@@ -70,53 +80,233 @@ def flatten_nested_json(item, parent_key='', sep='_'):
                 flattened_item[new_key] = value
     return flattened_item
 
-# Function to save data to the database
-def save_data_to_db(data, table, session):
-    table_columns = {column.name for column in table.__table__.columns}
-    added_count = 0
-    replaced_count = 0
+# Function to compute the content hash of a converted row
+def get_row_hash(row):
+    return hashlib.sha1(json.dumps(row, sort_keys=True, default=str, separators=(',', ':')).encode()).hexdigest()
+
+# Function to upsert a page of rows, skipping rows whose content hash has not changed.
+# Returns (added, changed, unchanged) counts. With commit=False the caller commits the transaction.
+def bulk_upsert(rows, table, session, commit=True, run_id=None):
+    # Keep the last copy of each UUID so a page never upserts the same key twice
+    rows_by_uuid = {}
+    for row in rows:
+        if row.get('UUID') is None:
+            logger.warning(f"Skipping {table.__tablename__} record without UUID")
+            continue
+        rows_by_uuid[row['UUID']] = row
+    if not rows_by_uuid:
+        return 0, 0, 0
+
+    table_name = table.__tablename__
+    hashes = {uuid: get_row_hash(row) for uuid, row in rows_by_uuid.items()}
+    stored_hashes = dict(
+        session.query(RecordHash.UUID, RecordHash.Hash)
+        .filter(RecordHash.TableName == table_name, RecordHash.UUID.in_(list(rows_by_uuid)))
+    )
+    # Sorted so concurrent writers take row locks in the same order
+    changed_uuids = sorted(uuid for uuid in rows_by_uuid if stored_hashes.get(uuid) != hashes[uuid])
+    unchanged_count = len(rows_by_uuid) - len(changed_uuids)
+    if not changed_uuids:
+        if commit:
+            session.commit()
+        return 0, 0, unchanged_count
+
+    # Stored versions of the changed records, read before they are overwritten: they tell inserts
+    # from updates and give the change log and write hooks the old values. Records with a stored hash
+    # are read FOR UPDATE, so a concurrent writer of the same UUIDs (a backfill or replay next to the
+    # scheduler) waits and then reads this transaction's result instead of undoing the same old values.
+    # Only existing rows are locked: locking a missing UUID takes a gap lock under REPEATABLE READ, and two
+    # writers inserting into each other's gaps deadlock. Records without a hash are read without a lock.
+    known_uuids = [uuid for uuid in changed_uuids if uuid in stored_hashes]
+    new_uuids = [uuid for uuid in changed_uuids if uuid not in stored_hashes]
+    old_rows = {}
+    if known_uuids:
+        query = select(table.__table__).where(table.UUID.in_(known_uuids)).with_for_update()
+        old_rows.update((row['UUID'], dict(row)) for row in session.execute(query).mappings())
+    if new_uuids:
+        query = select(table.__table__).where(table.UUID.in_(new_uuids))
+        old_rows.update((row['UUID'], dict(row)) for row in session.execute(query).mappings())
+    added_count = len([uuid for uuid in changed_uuids if uuid not in old_rows])
+    changed_count = len(changed_uuids) - added_count
+
+    changed_rows = [rows_by_uuid[uuid] for uuid in changed_uuids]
+    affected_rows = upsert_rows(session, table.__table__, changed_rows, {'UUID'})
+    upsert_rows(
+        session,
+        RecordHash.__table__,
+        [{'TableName': table_name, 'UUID': uuid, 'Hash': hashes[uuid]} for uuid in changed_uuids],
+        {'TableName', 'UUID'},
+    )
+    write_change_log(session, build_change_records(table_name, changed_rows, old_rows, run_id))
+    run_write_hooks(session, table, changed_rows, old_rows)
+    if commit:
+        session.commit()
 
+    # MySQL reports 1 per insert and 2 per changed row (1 for an unchanged row under CLIENT_FOUND_ROWS)
+    logger.debug(f"{table_name}: upserted {len(changed_uuids)} rows, {affected_rows} affected rows")
+    return added_count, changed_count, unchanged_count
+
+# Function to save data to the database
+def save_data_to_db(data, table, session, commit=True, run_id=None):
     # Assuming 'data' is a list of dictionaries and mapping it to the table structure
-    for item in data:
-        flattened_item = flatten_nested_json(item)
-        filtered_item = {key: value for key, value in flattened_item.items() if key in table_columns}
-        new_record = table(**filtered_item)
-        
-        # Check if the record already exists
-        existing_record = session.query(table).filter_by(UUID=new_record.UUID).first()
-        if existing_record:
-            replaced_count += 1
-        else:
-            added_count += 1
-        
-        session.merge(new_record)  # Use merge to handle duplicates based on primary key (UUID)
-    
-    session.commit()
-    return added_count, replaced_count
+    convert = get_converter(table)
+    return bulk_upsert([convert(item) for item in data], table, session, commit, run_id)
 
-# Function to fetch data in batches with incremented offset
-def fetch_data_in_batches(api_token, endpoint, date, start_offset, table, session, batch_size=100):
+# Function to yield (offset, records) for every page of an endpoint until an empty page is returned
+def iter_api_pages(api_token, endpoint, date, start_offset, limiter=api_rate_limiter, spool=None):
     offset = start_offset
-    total_added = 0
-    total_replaced = 0
-    try:
+    while True:
+        print('fetching data... offset', offset, 'enpoint', endpoint, 'date', date)
+        api_data = fetch_data_from_api(api_token, endpoint, date, offset, limiter)
+        if not api_data or not api_data.get('data'):
+            print('api_data from utils', api_data)
+            return
+        if spool is not None:
+            spool.append(date, offset, api_data['data'])
+        yield offset, api_data['data']  # Assuming 'data' is the list containing job data
+        offset += 1
+
+# Function to stream every page of an endpoint, converting records as they are parsed.
+# Yields (offset, rows) where rows are already converted for `table`.
+# With a spool each raw record is written to it as it is parsed rather than kept until the page ends.
+def iter_streamed_pages(api_token, endpoint, date, start_offset, table, limiter=api_rate_limiter, spool=None):
+    client = get_client(api_token)
+    convert = get_converter(table)
+    offset = start_offset
+    while True:
+        print('streaming data... offset', offset, 'enpoint', endpoint, 'date', date)
+        spooled = spool.start_page(date, offset) if spool is not None else None
+        rows = []
+        try:
+            for record in client.iter_page_records(endpoint, date, offset, limiter=limiter):
+                if spooled is not None:
+                    spooled.write(record)
+                rows.append(convert(record))
+        except BaseException:
+            if spooled is not None:
+                spooled.abort()
+            raise
+        if not rows:
+            if spooled is not None:
+                spooled.abort()
+            return
+        if spooled is not None:
+            spooled.finish()
+        yield offset, rows
+        offset += 1
+
+# Function to fetch data in batches with incremented offset.
+# Pages are fetched in a background thread while the previous page is flattened and written.
+# With stream=True records are parsed and converted incrementally by the fetcher instead.
+# With a run_id every page is committed together with that run's checkpoint.
+# When SPOOL_DIR is set every fetched page is spooled to disk first, so pages that could not be
+# written are not lost and can be loaded later with replay.py; the spool is deleted once the run completes.
+# Once the `stop` event is set no further page is fetched; pages already fetched are still written and the
+# run is left unfinished so it can be resumed.
+def fetch_data_in_batches(api_token, endpoint, date, start_offset, table, session, batch_size=100, limiter=api_rate_limiter, stream=False,
+                          run_id=None, watermark=None, stop=None):
+    watermark_column = get_watermark_column(table)
+    result = {
+        'run_id': run_id,
+        'endpoint': endpoint,
+        'start_date': date,
+        'last_offset': start_offset,
+        'added': 0,
+        'changed': 0,
+        'unchanged': 0,
+        'watermark': watermark,
+        'completed': False,
+        'stopped': False,
+        # Seconds spent fetching pages (including rate limit waits), converting records and writing them
+        'timings': {'fetch': 0.0, 'convert': 0.0, 'write': 0.0},
+    }
+    convert = get_converter(table)
+    spool = open_spool(endpoint, run_id=run_id)
+    run_started = time.perf_counter()
+    limiter_before = limiter.get_metrics()
+    metrics_before = sync_metrics.snapshot()
+
+    def timed_pages(pages):
+        pages = iter(pages)
         while True:
-            print('fetching data... offset', offset, 'enpoint', endpoint, 'date', date)
-            api_data = fetch_data_from_api(api_token, endpoint, date, offset)
-            if not api_data or not api_data.get('data'):
-                print('api_data from utils', api_data)
-                break
-            added, replaced = save_data_to_db(api_data['data'], table, session)  # Assuming 'data' is the list containing job data
-            total_added += added
-            total_replaced += replaced
-            logger.info(f"Endpoint {endpoint}: Date {date}: Batch offset {offset}: Added {added}, Replaced {replaced}")
-            offset += 1
-            # Waiting for 30 seconds to prevent API lockout :P.
-            time.sleep(30)
+            if stop is not None and stop.is_set():
+                result['stopped'] = True
+                logger.info(f"Endpoint {endpoint}: stop requested, no further pages will be fetched")
+                return
+            started = time.perf_counter()
+            try:
+                page = next(pages)
+            except StopIteration:
+                return
+            finally:
+                result['timings']['fetch'] += time.perf_counter() - started
+            yield page
+
+    def write_page(page):
+        offset, data = page
+        started = time.perf_counter()
+        rows = data if stream else [convert(item) for item in data]
+        converted = time.perf_counter()
+        watermark = result['watermark']
+        page_watermark = get_page_watermark(rows, watermark_column)
+        if page_watermark is not None and (watermark is None or page_watermark > watermark):
+            watermark = page_watermark
+
+        def write(session):
+            counts = bulk_upsert(rows, table, session, commit=False, run_id=run_id)
+            if run_id is not None:
+                record_checkpoint(session, run_id, offset + 1, watermark)
+            return counts
+
+        added, changed, unchanged = run_transaction(session, write)
+        result['added'] += added
+        result['changed'] += changed
+        result['unchanged'] += unchanged
+        result['watermark'] = watermark
+        # Offset of the next page to fetch, only advanced once this page is committed
+        result['last_offset'] = offset + 1
+        result['timings']['convert'] += converted - started
+        result['timings']['write'] += time.perf_counter() - converted
+        sync_metrics.observe('workiz_convert_seconds', endpoint, converted - started)
+        sync_metrics.observe('workiz_db_write_seconds', endpoint, time.perf_counter() - converted)
+        sync_metrics.inc('workiz_rows_received_total', endpoint, len(data))
+        sync_metrics.inc('workiz_rows_written_total', endpoint, added + changed)
+        logger.info(f"Endpoint {endpoint}: Date {date}: Batch offset {offset}: Added {added}, Changed {changed}, Unchanged {unchanged}")
+
+    try:
+        if stream:
+            produce = lambda: iter_streamed_pages(api_token, endpoint, date, start_offset, table, limiter, spool)
+        else:
+            produce = lambda: iter_api_pages(api_token, endpoint, date, start_offset, limiter, spool)
+        run_pipeline(lambda: timed_pages(produce()), write_page, name=endpoint)
+        result['completed'] = not result['stopped']
+        if result['completed'] and spool is not None:
+            spool.discard()
     except Exception as e:
         logger.error(f"Error fetching data in batches: {e}")
+        sync_metrics.inc('workiz_sync_errors_total', endpoint)
+        session.rollback()
+        if spool is not None and spool.paths:
+            logger.error(f"Endpoint {endpoint}: pages from offset {result['last_offset']} on were fetched but not written "
+                         f"to {', '.join(spool.paths)}; load them with: python replay.py")
     finally:
+        try:
+            if run_id is not None:
+                finish_run(session, run_id, 'completed' if result['completed'] else 'stopped' if result['stopped'] else 'failed')
+        except Exception as e:
+            logger.error(f"Error recording end of run {run_id}: {e}")
         session.close()
     
-    logger.info(f"Endpoint {endpoint}: Total added: {total_added}, Total replaced: {total_replaced}")
-
+    logger.info(f"Endpoint {endpoint}: Total added: {result['added']}, Total changed: {result['changed']}, Total unchanged: {result['unchanged']}")
+    limiter_after = limiter.get_metrics()
+    elapsed = time.perf_counter() - run_started
+    sync_metrics.inc('workiz_rate_limit_wait_seconds_total', endpoint, limiter_after['wait_seconds'] - limiter_before['wait_seconds'])
+    sync_metrics.inc('workiz_rate_limit_throttled_total', endpoint, limiter_after['throttled'] - limiter_before['throttled'])
+    sync_metrics.set('workiz_sync_duration_seconds', endpoint, round(elapsed, 3))
+    received = sync_metrics.get('workiz_rows_received_total', endpoint, since=metrics_before)
+    sync_metrics.set('workiz_sync_rows_per_second', endpoint, round(received / elapsed, 3) if elapsed else 0)
+    if result['completed']:
+        sync_metrics.set('workiz_sync_last_success_timestamp_seconds', endpoint, int(time.time()))
+    logger.info(sync_metrics.summary(endpoint, since=metrics_before))
+    sync_metrics.write_file()
+    return result
@@ -0,0 +1,270 @@
+"""Data access shared by the table viewer and the export command: schema cache, paging and query building."""
+import os
+import re
+import time
+import pickle
+import logging
+from datetime import datetime
+from dotenv import load_dotenv
+from sqlalchemy import MetaData, Table, DateTime, Float, Integer, inspect, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from db import get_engine
+
+# Load environment variables
+load_dotenv()
+
+# Rows per page when browsing a whole table
+PAGE_SIZE = int(os.getenv('VIEWER_PAGE_SIZE', '50'))
+# Seconds reflected schema is trusted before it is read again, and an optional file keeping it between sessions
+SCHEMA_CACHE_TTL = int(os.getenv('VIEWER_SCHEMA_CACHE_TTL', '600'))
+SCHEMA_CACHE_FILE = os.getenv('VIEWER_SCHEMA_CACHE_FILE')
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Create SQLAlchemy engine and MetaData
+engine = get_engine()
+metadata = MetaData()
+
+metadata.bind = engine
+
+
+class SchemaCache:
+    # Caches the table list and the tables reflected so far. Only tables that are actually
+    # opened are reflected, entries expire after `ttl` seconds and the cache can be saved to `path`.
+    def __init__(self, engine, metadata, ttl=SCHEMA_CACHE_TTL, path=SCHEMA_CACHE_FILE):
+        self.engine = engine
+        self.metadata = metadata
+        self.ttl = ttl
+        self.path = path
+        self.table_names_cache = None
+        self.table_names_at = 0.0
+        self.reflected_at = {}
+        self.load()
+
+    def is_fresh(self, cached_at):
+        return time.time() - cached_at < self.ttl
+
+    # Function to list table names; a single catalog query instead of reflecting every table
+    def get_table_names(self):
+        if self.table_names_cache is None or not self.is_fresh(self.table_names_at):
+            self.table_names_cache = sorted(inspect(self.engine).get_table_names())
+            self.table_names_at = time.time()
+            self.save()
+        return self.table_names_cache
+
+    # Function to get one table, reflecting it only when it is not cached or has expired
+    def get_table(self, table_name):
+        cached_at = self.reflected_at.get(table_name)
+        if table_name in self.metadata.tables and cached_at is not None and self.is_fresh(cached_at):
+            return self.metadata.tables[table_name]
+        if table_name in self.metadata.tables:
+            self.metadata.remove(self.metadata.tables[table_name])
+        table = Table(table_name, self.metadata, autoload_with=self.engine)
+        self.reflected_at[table_name] = time.time()
+        self.save()
+        return table
+
+    # Function to drop everything cached so the next lookups read the database again
+    def refresh(self):
+        self.metadata.clear()
+        self.reflected_at = {}
+        self.table_names_cache = None
+        self.save()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                state = pickle.load(f)
+            if state.get('url') != self.engine.url.render_as_string(hide_password=True):
+                return
+            for table in state['metadata'].tables.values():
+                table.to_metadata(self.metadata)
+            self.reflected_at = state['reflected_at']
+            self.table_names_cache = state['table_names']
+            self.table_names_at = state['table_names_at']
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable schema cache {self.path}: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        state = {
+            'url': self.engine.url.render_as_string(hide_password=True),
+            'metadata': self.metadata,
+            'reflected_at': self.reflected_at,
+            'table_names': self.table_names_cache,
+            'table_names_at': self.table_names_at,
+        }
+        try:
+            with open(self.path, 'wb') as f:
+                pickle.dump(state, f)
+        except Exception as e:
+            logger.warning(f"Could not save schema cache {self.path}: {e}")
+
+
+schema_cache = SchemaCache(engine, metadata)
+
+# Function to fetch all tables
+def fetch_all_tables():
+    try:
+        return schema_cache.get_table_names()
+    except SQLAlchemyError as e:
+        logger.error(f"Error fetching tables: {e}")
+        return []
+
+# Function to turn comma-separated column indices or names into column names (all columns when empty)
+def resolve_columns(columns, selected_columns):
+    if selected_columns:
+        selected = [item.strip() for item in selected_columns.split(',')]
+        return [columns[int(item)] if item.isdigit() else item for item in selected
+                if (item.isdigit() and int(item) < len(columns)) or item in columns]
+    return columns
+
+# Function to fetch table data
+def fetch_table_data(table_name, limit=None, selected_columns=None):
+    try:
+        conn = engine.connect()
+        table = schema_cache.get_table(table_name)
+        selected_columns = resolve_columns(table.columns.keys(), selected_columns)
+
+        if limit:
+            query = select(*[getattr(table.c, col) for col in selected_columns]).limit(limit)
+        else:
+            query = select(*[getattr(table.c, col) for col in selected_columns])
+
+        result = conn.execute(query)
+        data = result.fetchall()
+        conn.close()
+        return data, selected_columns
+    except SQLAlchemyError as e:
+        logger.error(f"Error fetching table data: {e}")
+        return [], []
+
+# Function to fetch one page of rows in primary key order, starting after the key `after_key`.
+# Keyset pagination: every page is an indexed range scan, however deep into the table it is.
+# Returns (rows, column names, key of the last row).
+def fetch_table_page(table_name, selected_columns=None, after_key=None, page_size=PAGE_SIZE):
+    table = schema_cache.get_table(table_name)
+    columns = resolve_columns(table.columns.keys(), selected_columns)
+    primary_key = list(table.primary_key.columns)
+
+    # Key columns are selected under their own labels so they can be read back even when not displayed
+    query = select(
+        *[getattr(table.c, col) for col in columns],
+        *[column.label(f"pk_{i}") for i, column in enumerate(primary_key)],
+    ).order_by(*primary_key).limit(page_size)
+    if after_key is not None:
+        if len(primary_key) == 1:
+            query = query.where(primary_key[0] > after_key[0])
+        else:
+            query = query.where(tuple_(*primary_key) > tuple_(*after_key))
+
+    with engine.connect() as conn:
+        rows = conn.execute(query).fetchall()
+    data = [tuple(row[:len(columns)]) for row in rows]
+    last_key = tuple(rows[-1][len(columns):]) if rows else None
+    return data, columns, last_key
+
+# Function to stream the rows of a query page by page from a server-side cursor.
+# Only for readers that keep consuming (export.py): MySQL drops a cursor left unread for net_write_timeout.
+def stream_query_pages(query, page_size=PAGE_SIZE):
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(query)
+        for partition in result.partitions(page_size):
+            yield partition
+
+# Function to fetch rows `offset` to `offset + page_size` of a query with its own LIMIT/OFFSET query, so nothing
+# is held open while a page is on screen. Without a unique ORDER BY the database may return rows in a different
+# order for every page, so callers sort by the primary key last where there is one.
+def fetch_query_page(query, offset=0, page_size=PAGE_SIZE):
+    with engine.connect() as conn:
+        return conn.execute(query.limit(page_size).offset(offset)).fetchall()
+
+# Filter syntax, one predicate per `;`: column op value, e.g.
+#   Status = Done; JobDateTime between 2024-01-01 and 2024-02-01; ServiceArea in North,South; Email like %@gmail.com
+FILTER_PATTERN = re.compile(r'^\s*(\w+)\s*(>=|<=|!=|=|>|<|not like|like|between|not in|in|is not null|is null)\s*(.*?)\s*$', re.IGNORECASE)
+
+# Function to convert a typed-in value to the column's Python type so it is sent as a bound parameter
+def coerce_filter_value(column, value):
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Integer):
+        return int(value)
+    if isinstance(column.type, Float):
+        return float(value)
+    return value
+
+# Function to turn one filter into a SQL expression on `table`
+def parse_filter(table, text):
+    match = FILTER_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Cannot parse filter '{text.strip()}'")
+    name, operator, value = match.group(1), match.group(2).lower(), match.group(3)
+    if name not in table.c:
+        raise ValueError(f"Unknown column '{name}'")
+    column = table.c[name]
+
+    if operator == 'is null':
+        return column.is_(None)
+    if operator == 'is not null':
+        return column.isnot(None)
+    if operator in ('in', 'not in'):
+        values = [coerce_filter_value(column, item.strip()) for item in value.split(',') if item.strip()]
+        return column.in_(values) if operator == 'in' else column.notin_(values)
+    if operator == 'between':
+        bounds = re.split(r'\s+and\s+', value, flags=re.IGNORECASE)
+        if len(bounds) != 2:
+            raise ValueError(f"Use '{name} between <low> and <high>'")
+        return column.between(coerce_filter_value(column, bounds[0]), coerce_filter_value(column, bounds[1]))
+    if operator == 'like':
+        return column.like(value)
+    if operator == 'not like':
+        return column.notlike(value)
+
+    value = coerce_filter_value(column, value)
+    return {
+        '=': column == value,
+        '!=': column != value,
+        '>': column > value,
+        '>=': column >= value,
+        '<': column < value,
+        '<=': column <= value,
+    }[operator]
+
+# Function to list the columns MySQL can sort by from an index (leading index columns and the key)
+def get_indexed_columns(table):
+    indexed = {column.name for column in table.primary_key.columns}
+    for index in table.indexes:
+        indexed.add(list(index.columns)[0].name)
+    return indexed
+
+# Function to turn "col [asc|desc], ..." into ORDER BY clauses
+def parse_order_by(table, text):
+    clauses = []
+    for part in [part.strip() for part in text.split(',') if part.strip()]:
+        words = part.split()
+        if words[0] not in table.c or len(words) > 2 or (len(words) == 2 and words[1].lower() not in ('asc', 'desc')):
+            raise ValueError(f"Cannot sort by '{part}'")
+        column = table.c[words[0]]
+        if column.name not in get_indexed_columns(table):
+            logger.warning(f"{column.name} is not indexed, so MySQL has to sort every matching row.")
+        clauses.append(column.desc() if len(words) == 2 and words[1].lower() == 'desc' else column.asc())
+    return clauses
+
+# Function to build a projected, filtered and sorted query so the database does the work
+# and only the chosen columns cross the wire
+def build_table_query(table_name, selected_columns=None, filters='', order_by='', limit=None):
+    table = schema_cache.get_table(table_name)
+    columns = resolve_columns(table.columns.keys(), selected_columns)
+    query = select(*[table.c[col] for col in columns])
+    for text in [text for text in filters.split(';') if text.strip()]:
+        query = query.where(parse_filter(table, text))
+    if order_by.strip():
+        query = query.order_by(*parse_order_by(table, order_by))
+    if limit:
+        query = query.limit(limit)
+    return query, columns
@@ -0,0 +1,243 @@
+import os
+import socket
+import signal
+import argparse
+import threading
+import logging
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_
+from db import get_session_factory, init_schema
+from models import BackfillWindow, WorkTask
+from rate_share import update_rate_share, remove_client
+from backfill import BACKFILL_SINCE, split_windows, plan_windows, backfill_window
+from sync import ENDPOINTS
+
+# Load environment variables
+load_dotenv()
+API_TOKEN = os.getenv('API_TOKEN')
+# Seconds between heartbeats of a claimed task, and after which a silent claim is taken over
+WORK_HEARTBEAT_SECONDS = int(os.getenv('WORK_HEARTBEAT_SECONDS', '15'))
+WORK_STALE_SECONDS = int(os.getenv('WORK_STALE_SECONDS', '90'))
+# Claims of a failing task before it is left as failed
+WORK_MAX_ATTEMPTS = int(os.getenv('WORK_MAX_ATTEMPTS', '3'))
+# Seconds an idle worker waits before looking for work again
+WORK_POLL_SECONDS = int(os.getenv('WORK_POLL_SECONDS', '10'))
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Function to queue every unfinished window of an endpoint, keeping tasks queued by an earlier call.
+# Tasks left as failed are queued again with their attempts reset.
+def enqueue_windows(session, endpoint, windows):
+    pending = plan_windows(session, endpoint, windows)
+    known = {task.WindowStart: task for task in session.query(WorkTask).filter(WorkTask.Endpoint == endpoint)}
+    now = datetime.now()
+    for window_start, window_end, _ in pending:
+        task = known.get(window_start)
+        if task is None:
+            session.add(WorkTask(Endpoint=endpoint, WindowStart=window_start, WindowEnd=window_end,
+                                 Status='pending', Attempts=0, UpdatedAt=now))
+        elif task.Status == 'failed':
+            logger.info(f"Endpoint {endpoint}: re-queueing failed window {window_start}")
+            task.Status = 'pending'
+            task.Attempts = 0
+            task.WorkerId = None
+            task.UpdatedAt = now
+    session.commit()
+    return len(pending)
+
+def _claimable(stale_before):
+    return or_(
+        WorkTask.Status == 'pending',
+        and_(WorkTask.Status == 'claimed', WorkTask.HeartbeatAt < stale_before),
+    )
+
+# Function to claim the oldest pending task, or one whose worker stopped heartbeating.
+# On MySQL FOR UPDATE SKIP LOCKED lets concurrent workers pass over rows another is claiming; the
+# update is also conditional on Attempts, so databases without row locks (SQLite) cannot double-claim.
+# Returns (endpoint, window start, window end) or None when nothing can be claimed.
+def claim_task(session, worker_id, stale_after=WORK_STALE_SECONDS):
+    for _ in range(5):
+        stale_before = datetime.now() - timedelta(seconds=stale_after)
+        task = (
+            session.query(WorkTask)
+            .filter(_claimable(stale_before))
+            .order_by(WorkTask.WindowStart, WorkTask.Endpoint)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if task is None:
+            session.commit()
+            return None
+        claimed = (task.Endpoint, task.WindowStart, task.WindowEnd)
+        previous_worker = task.WorkerId if task.Status == 'claimed' else None
+        now = datetime.now()
+        updated = session.query(WorkTask).filter(
+            WorkTask.Endpoint == task.Endpoint,
+            WorkTask.WindowStart == task.WindowStart,
+            WorkTask.Attempts == task.Attempts,
+            _claimable(stale_before),
+        ).update({'Status': 'claimed', 'WorkerId': worker_id, 'HeartbeatAt': now, 'UpdatedAt': now,
+                  'Attempts': task.Attempts + 1}, synchronize_session=False)
+        session.commit()
+        if updated:
+            if previous_worker:
+                logger.warning(f"Endpoint {claimed[0]}: window {claimed[1]} taken over from {previous_worker}, which stopped heartbeating")
+            return claimed
+    return None
+
+# Function to refresh the heartbeat of a claimed task; False when the claim was lost to another worker
+def heartbeat(session, endpoint, window_start, worker_id):
+    updated = session.query(WorkTask).filter(
+        WorkTask.Endpoint == endpoint, WorkTask.WindowStart == window_start,
+        WorkTask.WorkerId == worker_id, WorkTask.Status == 'claimed',
+    ).update({'HeartbeatAt': datetime.now()}, synchronize_session=False)
+    session.commit()
+    return updated == 1
+
+# Function to hand a claimed task back after it completed, failed or was stopped.
+# Failed tasks are retried until WORK_MAX_ATTEMPTS claims; stopped ones are re-queued without using up an attempt.
+def release_task(session, endpoint, window_start, worker_id, outcome):
+    task = session.query(WorkTask).filter(
+        WorkTask.Endpoint == endpoint, WorkTask.WindowStart == window_start, WorkTask.WorkerId == worker_id,
+    ).first()
+    if task is None:
+        session.commit()
+        return
+    if outcome == 'completed':
+        task.Status = 'completed'
+    elif outcome == 'stopped':
+        task.Status = 'pending'
+        task.Attempts -= 1
+    elif task.Attempts < WORK_MAX_ATTEMPTS:
+        task.Status = 'pending'
+    else:
+        task.Status = 'failed'
+    task.UpdatedAt = datetime.now()
+    session.commit()
+
+# Function to tell whether any task is still pending or claimed
+def has_open_tasks(session):
+    return session.query(WorkTask).filter(WorkTask.Status.in_(['pending', 'claimed'])).first() is not None
+
+
+# Function to run one claimed task while a background thread heartbeats it and keeps the rate share current.
+# Returns 'completed', 'failed', 'stopped' or 'lost' (the claim was taken over by another worker).
+def run_task(api_token, Session, worker_id, endpoint, window_start, window_end, stop):
+    task_stop = threading.Event()
+    done = threading.Event()
+    lost = threading.Event()
+
+    def keep_alive():
+        session = Session()
+        try:
+            ticks = 0
+            while not done.wait(1):
+                ticks += 1
+                if stop.is_set():
+                    task_stop.set()
+                if ticks % WORK_HEARTBEAT_SECONDS:
+                    continue
+                try:
+                    if not heartbeat(session, endpoint, window_start, worker_id):
+                        logger.error(f"Endpoint {endpoint}: lost the claim on window {window_start}, stopping it")
+                        lost.set()
+                        task_stop.set()
+                    update_rate_share(session, worker_id, 'worker')
+                except Exception as e:
+                    session.rollback()
+                    logger.error(f"Heartbeat failed: {e}")
+        finally:
+            session.close()
+
+    session = Session()
+    try:
+        next_offset = session.query(BackfillWindow.NextOffset).filter(
+            BackfillWindow.Endpoint == endpoint, BackfillWindow.WindowStart == window_start
+        ).scalar() or 0
+        clients = update_rate_share(session, worker_id, 'worker')
+        logger.info(f"Worker {worker_id}: window {endpoint} {window_start}..{window_end} from offset {next_offset}, "
+                    f"{clients} processes sharing the API budget")
+    finally:
+        session.close()
+
+    thread = threading.Thread(target=keep_alive, name=f"heartbeat-{window_start}", daemon=True)
+    thread.start()
+    try:
+        totals = backfill_window(api_token, endpoint, window_start, window_end, next_offset, Session, stop=task_stop)
+    finally:
+        done.set()
+        thread.join()
+
+    if lost.is_set():
+        return 'lost'
+    outcome = 'completed' if totals['completed'] else 'stopped' if stop.is_set() else 'failed'
+    session = Session()
+    try:
+        release_task(session, endpoint, window_start, worker_id, outcome)
+    finally:
+        session.close()
+    return outcome
+
+# Function to claim and run tasks until the queue is drained or `stop` is set.
+# Waits for claims held by other workers, since those are taken over if their worker dies.
+def run_worker(api_token, Session, worker_id, stop):
+    counts = {'completed': 0, 'failed': 0, 'stopped': 0, 'lost': 0}
+    while not stop.is_set():
+        session = Session()
+        try:
+            task = claim_task(session, worker_id)
+            open_tasks = task is not None or has_open_tasks(session)
+        finally:
+            session.close()
+        if task is None:
+            if not open_tasks:
+                break
+            stop.wait(WORK_POLL_SECONDS)
+            continue
+        counts[run_task(api_token, Session, worker_id, *task, stop)] += 1
+    session = Session()
+    try:
+        remove_client(session, worker_id)
+    finally:
+        session.close()
+    logger.info(f"Worker {worker_id} finished: {counts}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Share a backfill between several worker processes")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    enqueue = subparsers.add_parser('enqueue', help="Queue the backfill windows of one or more endpoints")
+    enqueue.add_argument('--endpoint', action='append', choices=list(ENDPOINTS), help="Endpoint to backfill (default: all registered)")
+    enqueue.add_argument('--since', default=BACKFILL_SINCE, help="First CreatedDate to backfill (YYYY-MM-DD)")
+    enqueue.add_argument('--until', default=(datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d"), help="Backfill up to this date (exclusive)")
+    enqueue.add_argument('--window-days', type=int, default=30, help="Days per window")
+    work = subparsers.add_parser('work', help="Claim and run queued windows until none are left")
+    work.add_argument('--worker-id', default=f"{socket.gethostname()}-{os.getpid()}")
+    args = parser.parse_args()
+
+    init_schema()
+    Session = get_session_factory()
+    if args.command == 'enqueue':
+        session = Session()
+        try:
+            for endpoint in args.endpoint or list(ENDPOINTS):
+                queued = enqueue_windows(session, endpoint, split_windows(args.since, args.until, args.window_days))
+                logger.info(f"Endpoint {endpoint}: {queued} windows queued")
+        finally:
+            session.close()
+        return
+
+    stop = threading.Event()
+    # Docker sends SIGTERM on stop; the current window goes back to the queue at its last committed page
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    run_worker(API_TOKEN, Session, args.worker_id, stop)
+
+
+if __name__ == "__main__":
+    main()
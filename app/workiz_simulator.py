@@ -0,0 +1,137 @@
+import gzip
+import json
+import time
+import random
+import argparse
+import logging
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from sample_data import generate_job, generate_lead
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Local stand-in for the Workiz API serving generated job/all and lead/all pages.
+# Like the fetcher, `offset` is a page number; records come oldest CreatedDate first.
+
+
+class WorkizSimulator:
+    def __init__(self, jobs=2000, leads=1000, latency=0.0, rate_limit=None, rate_window=60.0, error_rate=0.0, retry_after=1):
+        self.datasets = {
+            'job/all': [generate_job(i) for i in range(jobs)],
+            'lead/all': [generate_lead(i) for i in range(leads)],
+        }
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.request_times = []
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'throttled': 0, 'errors': 0, 'bytes_sent': 0}
+
+    # Function to decide whether a request exceeds the simulated rate limit (sliding window)
+    def is_throttled(self):
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            self.request_times = [t for t in self.request_times if now - t < self.rate_window]
+            if len(self.request_times) >= self.rate_limit:
+                self.stats['throttled'] += 1
+                return True
+            self.request_times.append(now)
+            return False
+
+    # Function to build the response body for a page request, or None for an unknown endpoint
+    def get_page(self, endpoint, start_date, offset, records):
+        data = self.datasets.get(endpoint)
+        if data is None:
+            return None
+        matching = [item for item in data if item['CreatedDate'] >= start_date] if start_date else data
+        page = matching[offset * records:(offset + 1) * records]
+        return {'flag': True, 'found': len(page), 'has_more': (offset + 1) * records < len(matching), 'data': page}
+
+    def make_handler(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def send_body(self, status, body, headers=None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                if body and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    body = gzip.compress(body, compresslevel=5)
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with simulator.lock:
+                    simulator.stats['bytes_sent'] += len(body)
+
+            def do_GET(self):
+                with simulator.lock:
+                    simulator.stats['requests'] += 1
+                if simulator.latency:
+                    time.sleep(simulator.latency)
+                if simulator.is_throttled():
+                    return self.send_body(429, b'{"error": "Too many requests"}', {'Retry-After': str(simulator.retry_after)})
+                if simulator.error_rate and random.random() < simulator.error_rate:
+                    with simulator.lock:
+                        simulator.stats['errors'] += 1
+                    return self.send_body(503, b'{"error": "Service unavailable"}')
+
+                # Paths look like /api/v1/<token>/<resource>/all/
+                url = urlparse(self.path)
+                parts = [part for part in url.path.split('/') if part]
+                params = parse_qs(url.query)
+                endpoint = '/'.join(parts[3:5]) if len(parts) >= 5 else ''
+                try:
+                    offset = int(params.get('offset', ['0'])[0])
+                    records = int(params.get('records', ['100'])[0])
+                except ValueError:
+                    return self.send_body(400, b'{"error": "Bad request"}')
+                page = simulator.get_page(endpoint, params.get('start_date', [''])[0], offset, records)
+                if page is None:
+                    return self.send_body(404, b'{"error": "Not found"}')
+                self.send_body(200, json.dumps(page).encode(), {'Content-Type': 'application/json'})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    # Function to start serving in a background thread; returns the base URL to use as WORKIZ_API_BASE_URL
+    def start(self, host='127.0.0.1', port=0):
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_port}/api/v1"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve simulated Workiz job/all and lead/all pages")
+    parser.add_argument('--port', type=int, default=8085)
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--leads', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.2, help="Seconds added to every response")
+    parser.add_argument('--rate-limit', type=int, help="Requests allowed per --rate-window before 429s")
+    parser.add_argument('--rate-window', type=float, default=60.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    simulator = WorkizSimulator(args.jobs, args.leads, args.latency, args.rate_limit, args.rate_window, args.error_rate)
+    base_url = simulator.start(port=args.port)
+    logger.info(f"Serving simulated Workiz API at {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        simulator.stop()
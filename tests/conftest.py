@@ -0,0 +1,22 @@
+import os
+import sys
+import pytest
+
+# The app's modules import each other by bare name, as they do when run from app/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+# Never fall back to the MySQL settings from .env
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+# Sessionmaker bound to a fresh SQLite file holding every table
+@pytest.fixture
+def Session(tmp_path):
+    from models import Base
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
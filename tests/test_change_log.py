@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from sample_data import generate_job
+from models import Jobs, ChangeLog
+from utils import save_data_to_db
+from change_log import get_changes, get_changed_columns
+
+
+def test_writes_record_inserts_and_changed_columns(Session):
+    jobs = [generate_job(i) for i in range(5)]
+    session = Session()
+    save_data_to_db(jobs, Jobs, session, run_id='run-1')
+    inserts = get_changes(session, settle_seconds=0)
+    assert [change.Operation for change in inserts] == ['insert'] * 5
+    inserted = {change.UUID: change for change in inserts}
+    assert inserted[jobs[0]['UUID']].RunId == 'run-1'
+    assert inserted[jobs[0]['UUID']].OldStatus is None
+    assert inserted[jobs[0]['UUID']].NewStatus == jobs[0]['Status']
+    assert 'SerialId' in inserted[jobs[0]['UUID']].ChangedColumns
+
+    old_status = jobs[2]['Status']
+    jobs[2]['Status'] = 'Canceled' if old_status != 'Canceled' else 'Done'
+    jobs[2]['JobNotes'] = 'Customer called to cancel'
+    save_data_to_db(jobs, Jobs, session, run_id='run-2')
+    updates = get_changes(session, after_id=inserts[-1].Id, table_name=Jobs.__tablename__, settle_seconds=0)
+    assert len(updates) == 1
+    change = updates[0]
+    assert (change.UUID, change.Operation, change.RunId) == (jobs[2]['UUID'], 'update', 'run-2')
+    assert change.ChangedColumns == ['JobNotes', 'Status']
+    assert (change.OldStatus, change.NewStatus) == (old_status, jobs[2]['Status'])
+
+    # A page with no changed record writes nothing to the log
+    save_data_to_db(jobs, Jobs, session)
+    assert session.query(ChangeLog).count() == 6
+    session.close()
+
+
+def test_float_noise_is_not_a_change():
+    assert get_changed_columns({'SubTotal': 123.45000457763672}, {'SubTotal': 123.45}) == []
+    assert get_changed_columns({'SubTotal': 123.45}, {'SubTotal': 123.5}) == ['SubTotal']
+
+
+def add_changes(session, ids, changed_at):
+    for change_id in ids:
+        session.add(ChangeLog(Id=change_id, TableName='jobs', UUID=f"uuid-{change_id}", Operation='update',
+                              ChangedColumns=['Status'], ChangedAt=changed_at))
+    session.commit()
+
+
+def test_reading_stops_before_a_gap_until_it_settles(Session):
+    session = Session()
+    add_changes(session, [1, 2], datetime.now() - timedelta(hours=1))
+    add_changes(session, [4, 5], datetime.now())
+
+    # Id 3 may still be in an open transaction
+    assert [change.Id for change in get_changes(session, settle_seconds=120)] == [1, 2]
+    assert get_changes(session, after_id=2, settle_seconds=120) == []
+    assert [change.Id for change in get_changes(session, after_id=2, settle_seconds=0)] == [4, 5]
+
+    # Once the changes after it are old enough, the gap was a rolled-back write
+    session.query(ChangeLog).filter(ChangeLog.Id >= 4).update({'ChangedAt': datetime.now() - timedelta(minutes=10)})
+    session.commit()
+    assert [change.Id for change in get_changes(session, settle_seconds=120)] == [1, 2, 4, 5]
+    session.close()
@@ -0,0 +1,59 @@
+from datetime import datetime
+import pytest
+import api_client
+import hooks
+import sync
+from workiz_simulator import WorkizSimulator
+from models import Jobs, SyncRun, SyncState
+from rate_limiter import RateLimiter
+from sync import sync_endpoint
+
+
+@pytest.fixture
+def simulator(monkeypatch):
+    simulator = WorkizSimulator(jobs=450, leads=0)
+    base_url = simulator.start()
+    monkeypatch.setattr('utils.get_client', lambda api_token: api_client.WorkizClient(api_token, base_url=base_url))
+    monkeypatch.setattr('spool.SPOOL_DIR', None)
+    monkeypatch.setitem(sync.ENDPOINTS['job/all'], 'limiter', RateLimiter(1000, 1))
+    yield simulator
+    simulator.stop()
+
+
+def test_failed_run_resumes_from_its_checkpoint(simulator, Session, monkeypatch):
+    pages_written = []
+
+    def fail_on_third_page(session, table, rows):
+        pages_written.append(len(rows))
+        if len(pages_written) == 3:
+            raise RuntimeError("database went away")
+
+    monkeypatch.setitem(hooks.WRITE_HOOKS, Jobs, hooks.WRITE_HOOKS.get(Jobs, []) + [fail_on_third_page])
+    result = sync_endpoint('token', 'job/all', Session, '2022-01-01', full=True)
+
+    assert not result['completed']
+    session = Session()
+    run = session.get(SyncRun, result['run_id'])
+    # Pages 0 and 1 were committed with their checkpoint; page 2 was rolled back
+    assert (run.Status, run.NextOffset) == ('failed', 2)
+    assert session.query(Jobs).count() == 200
+    assert session.get(SyncState, 'job/all') is None
+    first_watermark = run.LastSeenDate
+    session.close()
+
+    monkeypatch.setitem(hooks.WRITE_HOOKS, Jobs, [hook for hook in hooks.WRITE_HOOKS[Jobs] if hook is not fail_on_third_page])
+    requests_before = simulator.stats['requests']
+    result = sync_endpoint('token', 'job/all', Session, '2022-01-01', full=True, resume=True)
+
+    assert result['completed']
+    # The resumed run fetched pages 2, 3 and 4 and the empty page that ends it
+    assert simulator.stats['requests'] - requests_before == 4
+    assert (result['added'], result['changed']) == (250, 0)
+    session = Session()
+    run = session.get(SyncRun, result['run_id'])
+    assert (run.Status, run.NextOffset) == ('completed', 5)
+    assert session.query(Jobs).count() == 450
+    newest = max(datetime.fromisoformat(job['CreatedDate']) for job in simulator.datasets['job/all'])
+    assert run.LastSeenDate == newest > first_watermark
+    assert session.get(SyncState, 'job/all').LastSeenDate == newest
+    session.close()
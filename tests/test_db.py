@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+from models import SyncState
+from db import run_transaction
+
+
+def mysql_error(code):
+    return OperationalError('INSERT ...', {}, Exception(code, 'error'))
+
+
+def test_deadlocked_transaction_is_retried(Session, monkeypatch):
+    monkeypatch.setattr('db.time.sleep', lambda seconds: None)
+    session = Session()
+    calls = []
+
+    def work(session):
+        calls.append(1)
+        session.add(SyncState(Endpoint=f"job/all-{len(calls)}"))
+        if len(calls) == 1:
+            session.flush()
+            raise mysql_error(1213)
+        return 'written'
+
+    assert run_transaction(session, work) == 'written'
+    # The first attempt was rolled back, only the retry is committed
+    assert [state.Endpoint for state in session.query(SyncState)] == ['job/all-2']
+    session.close()
+
+
+def test_other_errors_are_not_retried(Session):
+    session = Session()
+    calls = []
+
+    def work(session):
+        calls.append(1)
+        raise mysql_error(1062)
+
+    with pytest.raises(OperationalError):
+        run_transaction(session, work)
+    assert len(calls) == 1
+    session.close()
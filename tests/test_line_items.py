@@ -0,0 +1,30 @@
+from sample_data import generate_job
+from models import Jobs, JobLineItem
+from utils import save_data_to_db
+from line_items import rebuild_line_items
+
+
+def stored_items(session):
+    return sorted((item.JobUUID, item.ItemId, item.Name, item.Quantity) for item in session.query(JobLineItem))
+
+
+def test_written_jobs_keep_their_line_items_and_rebuild_matches(Session):
+    jobs = [generate_job(i) for i in range(120)]
+    session = Session()
+    save_data_to_db(jobs, Jobs, session)
+    written = stored_items(session)
+    assert len(written) == sum(len(job['LineItems']) for job in jobs)
+
+    # Dropping an item from a job removes its row on the next write
+    trimmed = next(job for job in jobs if job['LineItems'])
+    trimmed['LineItems'] = trimmed['LineItems'][1:]
+    save_data_to_db(jobs, Jobs, session)
+    assert len(stored_items(session)) == len(written) - 1
+
+    # Jobs written before the hook existed get their items from the rebuild
+    expected = stored_items(session)
+    session.query(JobLineItem).delete()
+    session.commit()
+    assert rebuild_line_items(session, batch_size=50) == len(expected)
+    assert stored_items(session) == expected
+    session.close()
@@ -0,0 +1,47 @@
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import pytest
+from workiz_simulator import WorkizSimulator
+from api_client import WorkizClient
+from rate_limiter import RateLimiter, parse_retry_after
+
+
+@pytest.fixture
+def simulator():
+    # One request per second, then 429s asking to retry after a second
+    simulator = WorkizSimulator(jobs=5, leads=0, rate_limit=1, rate_window=1.0, retry_after=1)
+    yield simulator
+    simulator.stop()
+
+
+def test_retry_after_is_honoured(simulator):
+    client = WorkizClient('token', base_url=simulator.start())
+    limiter = RateLimiter(100, 1, name='test')
+
+    client.get_page('job/all', '2022-01-01', 0, limiter=limiter)
+    started = time.monotonic()
+    page = client.get_page('job/all', '2022-01-01', 0, limiter=limiter)
+
+    assert page['found'] == 5
+    assert simulator.stats['throttled'] == 1
+    assert limiter.get_metrics()['throttled'] == 1
+    # The retry waited out Retry-After instead of hammering the API
+    assert time.monotonic() - started >= 0.9
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    in_ten_seconds = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=10), usegmt=True)
+    assert 8 <= parse_retry_after(in_ten_seconds) <= 10
+
+
+def test_set_share_scales_budget():
+    limiter = RateLimiter(60, 60)
+    limiter.set_share(1 / 3)
+    assert limiter.max_rate == pytest.approx(1 / 3)
+    assert limiter.capacity == pytest.approx(20)
+    limiter.set_share(1)
+    assert limiter.max_rate == pytest.approx(1)
@@ -0,0 +1,37 @@
+import utils
+from sample_data import generate_job
+from models import Jobs, RecordHash
+from utils import save_data_to_db, get_row_hash
+
+
+def test_unchanged_records_are_not_written_again(Session, monkeypatch):
+    jobs = [generate_job(i) for i in range(40)]
+    session = Session()
+    save_data_to_db(jobs, Jobs, session)
+    assert session.query(RecordHash).filter(RecordHash.TableName == Jobs.__tablename__).count() == 40
+
+    def fail(*args, **kwargs):
+        raise AssertionError("unchanged page was upserted")
+
+    monkeypatch.setattr(utils, 'upsert_rows', fail)
+    assert save_data_to_db(jobs, Jobs, session) == (0, 0, 40)
+    session.close()
+
+
+def test_changed_record_updates_its_hash(Session):
+    jobs = [generate_job(i) for i in range(10)]
+    session = Session()
+    save_data_to_db(jobs, Jobs, session)
+    old_hash = session.get(RecordHash, (Jobs.__tablename__, jobs[3]['UUID'])).Hash
+
+    jobs[3]['JobAmountDue'] = 0.5
+    assert save_data_to_db(jobs, Jobs, session) == (0, 1, 9)
+    new_hash = session.get(RecordHash, (Jobs.__tablename__, jobs[3]['UUID'])).Hash
+    assert new_hash != old_hash
+    assert save_data_to_db(jobs, Jobs, session) == (0, 0, 10)
+    session.close()
+
+
+def test_row_hash_ignores_key_order():
+    assert get_row_hash({'a': 1, 'b': 'x'}) == get_row_hash({'b': 'x', 'a': 1})
+    assert get_row_hash({'a': 1}) != get_row_hash({'a': 2})
@@ -0,0 +1,69 @@
+import os
+from datetime import datetime
+from sample_data import generate_job
+from models import Jobs, SyncRun
+from spool import PageSpool
+from checkpoints import start_run, record_checkpoint, finish_run
+from replay import replay_run, replay_pending
+
+
+def spool_pages(directory, run_id, pages):
+    spool = PageSpool(str(directory), 'job/all', run_id=run_id)
+    for offset, jobs in pages:
+        spool.append('2022-01-01', offset, jobs)
+    return spool.path
+
+
+def new_run(session, next_offset=0, status='failed'):
+    run_id = start_run(session, 'job/all', '2022-01-01')
+    record_checkpoint(session, run_id, next_offset)
+    finish_run(session, run_id, status)
+    return run_id
+
+
+def test_replay_loads_the_latest_attempt_of_each_offset_up_to_a_missing_one(Session, tmp_path):
+    jobs = [generate_job(i) for i in range(60)]
+    page = lambda offset: jobs[offset * 10:(offset + 1) * 10]
+    session = Session()
+    run_id = new_run(session, next_offset=1)
+
+    # The first attempt spooled offsets 0-3 and committed offset 0; the second fetched 1 and 2 again
+    first = spool_pages(tmp_path / 'first', run_id, [(offset, page(offset)) for offset in range(4)])
+    edited = [dict(job, JobNotes='Fetched again') for job in page(1)]
+    second = spool_pages(tmp_path / 'second', run_id, [(1, edited), (2, page(2)), (5, page(5))])
+
+    totals = replay_run(Session, 'job/all', run_id, [first, second])
+
+    # Offset 0 was already committed, offset 3 comes from the first attempt, and 4 is missing so 5 is not loaded
+    assert totals['pages'] == 3
+    assert session.query(Jobs).count() == 30
+    assert {job.JobNotes for job in session.query(Jobs).filter(Jobs.UUID.in_([job['UUID'] for job in page(1)]))} == {'Fetched again'}
+    assert session.query(Jobs).filter(Jobs.UUID.in_([job['UUID'] for job in page(5)])).count() == 0
+    session.expire_all()
+    run = session.get(SyncRun, run_id)
+    assert run.NextOffset == 4
+    assert run.LastSeenDate == max(datetime.fromisoformat(job['CreatedDate']) for job in jobs[:40])
+    assert os.path.exists(first) and os.path.exists(second)
+    session.close()
+
+
+def test_spools_of_completed_and_superseded_runs_are_deleted(Session, tmp_path):
+    jobs = [generate_job(i) for i in range(20)]
+    session = Session()
+    completed = new_run(session, next_offset=1, status='completed')
+    completed_path = spool_pages(tmp_path, completed, [(0, jobs[:10])])
+    superseded = new_run(session)
+    superseded_path = spool_pages(tmp_path, superseded, [(0, jobs[:10])])
+    latest = new_run(session)
+    latest_path = spool_pages(tmp_path, latest, [(0, jobs[10:])])
+
+    replay_pending(Session, str(tmp_path))
+
+    assert not os.path.exists(completed_path)
+    assert not os.path.exists(superseded_path)
+    # The run a resume would continue keeps its spool until that run completes
+    assert os.path.exists(latest_path)
+    assert {job.UUID for job in session.query(Jobs)} == {job['UUID'] for job in jobs[10:]}
+    session.expire_all()
+    assert session.get(SyncRun, latest).NextOffset == 1
+    session.close()
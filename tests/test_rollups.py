@@ -0,0 +1,37 @@
+from sample_data import generate_job, generate_lead
+from models import Jobs, Leads, JobDailyRollup, LeadDailyRollup
+from utils import save_data_to_db
+from rollups import ROLLUPS, rebuild_rollup
+
+
+def snapshot(session, table):
+    rollup = ROLLUPS[table]['rollup']
+    return sorted(tuple(getattr(row, column.name) for column in rollup.__table__.columns) for row in session.query(rollup))
+
+
+def test_rollups_match_rebuild_after_inserts_and_updates(Session):
+    jobs = [generate_job(i) for i in range(300)]
+    leads = [generate_lead(i) for i in range(100)]
+    session = Session()
+    save_data_to_db(jobs, Jobs, session)
+    save_data_to_db(leads, Leads, session)
+
+    # Move records between days and dimensions, change amounts and use a value longer than the rollup key
+    for job in jobs[::5]:
+        job['JobType'] = 'Service call' if job['JobType'] != 'Service call' else 'Installation'
+        job['JobTotalPrice'] = round(job['JobTotalPrice'] + 10.1, 2)
+        job['JobDateTime'] = '2023-01-01 09:00:00'
+    for job in jobs[1::7]:
+        job['JobSource'] = 'x' * 250
+    for lead in leads[::3]:
+        lead['Status'] = 'Converted'
+    save_data_to_db(jobs, Jobs, session)
+    save_data_to_db(leads, Leads, session)
+
+    incremental = {table: snapshot(session, table) for table in ROLLUPS}
+    for table in ROLLUPS:
+        rebuild_rollup(session, table)
+        assert snapshot(session, table) == incremental[table]
+    assert session.query(JobDailyRollup).filter(JobDailyRollup.Day == '2023-01-01').count() > 0
+    assert sum(row.Leads for row in session.query(LeadDailyRollup)) == 100
+    session.close()
@@ -0,0 +1,52 @@
+import pytest
+from workiz_simulator import WorkizSimulator
+from models import Jobs
+from spool import PageSpool, read_spool
+from rate_limiter import RateLimiter, request_with_backoff
+import api_client
+from utils import iter_streamed_pages
+
+pytest.importorskip('ijson')
+
+
+@pytest.fixture
+def simulator(monkeypatch):
+    simulator = WorkizSimulator(jobs=250, leads=0)
+    base_url = simulator.start()
+    monkeypatch.setattr('utils.get_client', lambda api_token: api_client.WorkizClient(api_token, base_url=base_url))
+    yield simulator
+    simulator.stop()
+
+
+def test_streamed_pages_are_spooled_as_parsed(simulator, tmp_path):
+    spool = PageSpool(str(tmp_path), 'job/all', run_id='run')
+    pages = list(iter_streamed_pages('token', 'job/all', '2022-01-01', 0, Jobs, RateLimiter(1000, 1), spool))
+
+    assert [len(rows) for _, rows in pages] == [100, 100, 50]
+    spooled = list(read_spool(spool.path))
+    # The empty page that ends the run is not spooled
+    assert [page['offset'] for page in spooled] == [0, 1, 2]
+    assert [record['UUID'] for page in spooled for record in page['data']] == \
+        [job['UUID'] for job in simulator.datasets['job/all']]
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_responses_are_closed_before_a_retry(monkeypatch):
+    monkeypatch.setattr('rate_limiter.time.sleep', lambda seconds: None)
+    responses = [FakeResponse(429, {'Retry-After': '0'}), FakeResponse(503), FakeResponse(200)]
+    sent = iter(responses)
+    limiter = RateLimiter(1000, 1)
+
+    response = request_with_backoff(lambda: next(sent), limiter, max_retries=3)
+
+    assert response is responses[2]
+    assert [response.closed for response in responses] == [True, True, False]
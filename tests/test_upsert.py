@@ -0,0 +1,43 @@
+from sample_data import generate_job
+from models import Jobs
+from utils import save_data_to_db
+
+
+def test_page_counts_added_and_changed_records(Session):
+    jobs = [generate_job(i) for i in range(50)]
+    session = Session()
+    assert save_data_to_db(jobs[:30], Jobs, session) == (30, 0, 0)
+
+    # A page overlapping the stored jobs inserts the new ones and updates the edited ones
+    jobs[0]['Status'] = 'Done Pending Approval'
+    jobs[1]['JobNotes'] = 'Rescheduled by phone'
+    added, changed, unchanged = save_data_to_db(jobs, Jobs, session)
+    assert (added, changed) == (20, 2)
+    assert added + changed + unchanged == 50
+    assert session.query(Jobs).count() == 50
+    assert session.get(Jobs, jobs[1]['UUID']).JobNotes == 'Rescheduled by phone'
+    session.close()
+
+
+def test_duplicate_uuids_in_a_page_keep_the_last_copy(Session):
+    job = generate_job(0)
+    edited = dict(job, JobNotes='Second copy')
+    session = Session()
+    assert save_data_to_db([job, edited], Jobs, session) == (1, 0, 0)
+    assert session.get(Jobs, job['UUID']).JobNotes == 'Second copy'
+    session.close()
+
+
+def test_fields_missing_from_a_record_keep_their_stored_value(Session):
+    job = generate_job(0)
+    session = Session()
+    save_data_to_db([job], Jobs, session)
+
+    partial = {'UUID': job['UUID'], 'Status': 'Canceled'}
+    assert save_data_to_db([partial], Jobs, session) == (0, 1, 0)
+    session.expire_all()
+    stored = session.get(Jobs, job['UUID'])
+    assert stored.Status == 'Canceled'
+    assert stored.SerialId == job['SerialId']
+    assert stored.JobSource == job['JobSource']
+    session.close()
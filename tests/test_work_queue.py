@@ -0,0 +1,78 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from models import ApiClient, WorkTask
+from rate_limiter import RateLimiter
+from rate_share import update_rate_share, remove_client
+from backfill import split_windows
+from work_queue import enqueue_windows, claim_task, release_task
+
+
+def test_two_workers_never_claim_the_same_task(Session):
+    session = Session()
+    queued = enqueue_windows(session, 'job/all', split_windows('2023-01-01', '2024-01-01', 7))
+    session.close()
+    claims = {'worker-1': [], 'worker-2': []}
+    start = threading.Barrier(2)
+
+    def work(worker_id):
+        session = Session()
+        start.wait()
+        while True:
+            task = claim_task(session, worker_id)
+            if task is None:
+                break
+            claims[worker_id].append(task)
+        session.close()
+
+    threads = [threading.Thread(target=work, args=(worker_id,)) for worker_id in claims]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    claimed = claims['worker-1'] + claims['worker-2']
+    assert len(claimed) == len(set(claimed)) == queued
+    session = Session()
+    assert {task.Attempts for task in session.query(WorkTask)} == {1}
+    session.close()
+
+
+def test_stale_claim_is_taken_over_and_failed_tasks_requeued(Session):
+    session = Session()
+    enqueue_windows(session, 'job/all', split_windows('2023-01-01', '2023-01-08', 7))
+    assert claim_task(session, 'worker-1') is not None
+    assert claim_task(session, 'worker-2') is None
+
+    session.query(WorkTask).update({'HeartbeatAt': datetime.now() - timedelta(hours=1)})
+    session.commit()
+    endpoint, window_start, _ = claim_task(session, 'worker-2')
+    # The first worker lost its claim, so its release is ignored
+    release_task(session, endpoint, window_start, 'worker-1', 'completed')
+    assert session.query(WorkTask).one().Status == 'claimed'
+
+    session.query(WorkTask).update({'Status': 'failed'})
+    session.commit()
+    enqueue_windows(session, 'job/all', split_windows('2023-01-01', '2023-01-08', 7))
+    task = session.query(WorkTask).one()
+    assert (task.Status, task.Attempts) == ('pending', 0)
+    session.close()
+
+
+def test_scheduler_and_workers_split_the_rate_budget(Session):
+    session = Session()
+    limiter = RateLimiter(60, 60)
+    assert update_rate_share(session, 'scheduler-1', 'scheduler', limiter) == 1
+    assert limiter.max_rate == pytest.approx(1)
+
+    update_rate_share(session, 'worker-1', 'worker', limiter)
+    assert update_rate_share(session, 'scheduler-1', 'scheduler', limiter) == 2
+    assert limiter.max_rate == pytest.approx(0.5)
+
+    # A process that stopped heartbeating no longer counts
+    session.query(ApiClient).filter(ApiClient.ClientId == 'worker-1').update({'HeartbeatAt': datetime.now() - timedelta(hours=1)})
+    session.commit()
+    assert update_rate_share(session, 'scheduler-1', 'scheduler', limiter) == 1
+    remove_client(session, 'scheduler-1')
+    assert session.query(ApiClient).count() == 1
+    session.close()